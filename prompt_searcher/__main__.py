@@ -0,0 +1,3 @@
+from prompt_searcher.cli import main
+
+main()
@@ -0,0 +1,42 @@
+import argparse
+from dotenv import load_dotenv
+import polars as pl
+from prompt_searcher.training.runner import load_config, run_config
+
+def main(argv: list[str] = None):
+    """
+    Run the experiments of a JSON config and print the leaderboard.
+
+    Args:
+        argv (list[str], optional): Command line arguments. Defaults to sys.argv.
+    """
+    parser = argparse.ArgumentParser(
+        prog="prompt-searcher",
+        description="Run many prompt search experiments with a shared cache and rate limiter."
+    )
+    parser.add_argument("config", help="Path to the JSON experiments config.")
+    parser.add_argument("--processes", type=int, default=1, help="Number of worker processes.")
+    parser.add_argument("--max-parallel-jobs", type=int, help="Maximum experiments running at once per process.")
+    parser.add_argument("--output-dir", help="Directory for per-row results and leaderboard.csv.")
+    parser.add_argument("--cache-path", help="SQLite file for the response cache, shared across processes.")
+    parser.add_argument("--verbose", action="store_true", help="Print the progress of every experiment.")
+    args = parser.parse_args(argv)
+
+    load_dotenv()
+    config = load_config(args.config)
+    if args.max_parallel_jobs is not None:
+        config["max_parallel_jobs"] = args.max_parallel_jobs
+    if args.output_dir is not None:
+        config["output_dir"] = args.output_dir
+    if args.cache_path is not None:
+        config["cache_path"] = args.cache_path
+    if args.verbose:
+        config["verbose"] = True
+
+    leaderboard = run_config(config, processes=args.processes)
+    with pl.Config(fmt_str_lengths=80, tbl_rows=-1):
+        print(leaderboard.drop("best_prompt"))
+    return leaderboard
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,6 @@
 from prompt_searcher.core.interfaces import (
     Agent,
+    GenerationProfile,
     LossFunction
 )
 
@@ -7,11 +8,20 @@ from prompt_searcher.core.agents import (
     OpenAIAgent,
     CustomAgent,
     AnthropicAgent,
-    GroqAgent
+    GroqAgent,
+    HedgedAgent,
+    LocalAgent,
+    CachedAgent,
+    RateLimitedAgent
 )
 
 from prompt_searcher.core.datasets.load import load_dataset, load_unsupervised_dataset
 from prompt_searcher.core.learning.backpropagation import Backpropagation
 from prompt_searcher.core.loss.naive_similarity import NaiveSimilarity
+from prompt_searcher.core.loss.adaptive_similarity import AdaptiveSimilarity, ScoreEstimate
 from prompt_searcher.core.prompts.objective_prompt import ObjectivePrompt
+from prompt_searcher.core.results.results_store import ResultsStore
+from prompt_searcher.core.resources.response_cache import ResponseCache
+from prompt_searcher.core.resources.rate_limiter import RateLimiter
+from prompt_searcher.training.row_sampler import RowSampler
 from prompt_searcher.training.prompt_search import PromptSearch
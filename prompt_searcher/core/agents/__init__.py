@@ -1,4 +1,8 @@
 from .openai_agent import OpenAIAgent
 from .anthropic_agent import AnthropicAgent
 from .custom_agent import CustomAgent
-from .groq_agent import GroqAgent
\ No newline at end of file
+from .groq_agent import GroqAgent
+from .local_agent import LocalAgent
+from .hedged_agent import HedgedAgent
+from .cached_agent import CachedAgent
+from .rate_limited_agent import RateLimitedAgent
\ No newline at end of file
@@ -1,32 +1,89 @@
 from prompt_searcher.core.interfaces.agent import Agent
-from anthropic import Anthropic
+from prompt_searcher.core.utils.loop_local import LoopLocal
+from anthropic import Anthropic, AsyncAnthropic
 
 class AnthropicAgent(Agent):
     def __init__(self, model: str, api_key: str = None, **kwargs):
         self.model = model
         self.client = Anthropic(api_key=api_key, **kwargs)
+        # Async clients are bound to the event loop they are first used in, so each loop gets its own.
+        self._async_clients = LoopLocal(lambda: AsyncAnthropic(api_key=api_key, **kwargs))
 
-    def generate_response(self, system_message: str, user_message: str, max_tokens: int = 1024) -> str:
+    @property
+    def async_client(self) -> AsyncAnthropic:
+        """The async client of the running event loop."""
+        return self._async_clients.get()
+
+    def generate_response(self, system_message: str, user_message: str, max_tokens: int = None) -> str:
         """
-        Generate a response from the Anthropic model.
+        Generate a response from the Anthropic model, applying the agent's generation profile.
 
         Args:
             system_message (str): The system message providing context to the model.
             user_message (str): The user message for which the model will generate a response.
+            max_tokens (int, optional): Overrides the profile's maximum number of output tokens.
+                Defaults to the profile's value, or 1024 when the profile sets none.
 
         Returns:
             str: The response generated by the model.
         """
-        completion = self.client.messages.create(
-            model=self.model,
-            max_tokens=max_tokens,
-            messages=[
-                {"role": "system", "content": system_message},
-                {"role": "user", "content": user_message}
-            ]
-        )
+        request = self._request(system_message, user_message, max_tokens)
+        if self.profile.stream:
+            with self.client.messages.stream(**request) as stream:
+                return self.profile.collect(stream.text_stream)
+        completion = self.client.messages.create(**request)
         return completion.content[0].text
 
+    async def agenerate_response(self, system_message: str, user_message: str, max_tokens: int = None) -> str:
+        """
+        Asynchronously generate a response from the Anthropic model.
+
+        Args:
+            system_message (str): The system message providing context to the model.
+            user_message (str): The user message for which the model will generate a response.
+            max_tokens (int, optional): Overrides the profile's maximum number of output tokens.
+
+        Returns:
+            str: The response generated by the model.
+        """
+        response, _ = await self.agenerate_response_with_usage(system_message, user_message, max_tokens=max_tokens)
+        return response
+
+    async def agenerate_response_with_usage(self, system_message: str, user_message: str, max_tokens: int = None) -> tuple[str, int | None]:
+        """
+        Asynchronously generate a response from the Anthropic model and report its output token count.
+
+        Args:
+            system_message (str): The system message providing context to the model.
+            user_message (str): The user message for which the model will generate a response.
+            max_tokens (int, optional): Overrides the profile's maximum number of output tokens.
+
+        Returns:
+            tuple[str, int | None]: The response and its output token count, or None for a
+                streamed response that was cut off.
+        """
+        request = self._request(system_message, user_message, max_tokens)
+        if self.profile.stream:
+            async with self.async_client.messages.stream(**request) as stream:
+                return await self.profile.acollect(stream.text_stream), None
+        completion = await self.async_client.messages.create(**request)
+        return completion.content[0].text, completion.usage.output_tokens
+
+    def _request(self, system_message: str, user_message: str, max_tokens: int = None) -> dict:
+        # The Messages API takes the system prompt and stop sequences as separate parameters,
+        # requires max_tokens and has no seed.
+        options = self.profile.request_options()
+        options.pop("seed", None)
+        if "stop" in options:
+            options["stop_sequences"] = options.pop("stop")
+        options["max_tokens"] = max_tokens or options.get("max_tokens", 1024)
+        return {
+            "model": self.model,
+            "system": system_message,
+            "messages": [{"role": "user", "content": user_message}],
+            **options
+        }
+
 # Example usage:
 # agent = AnthropicAgent(model="claude-3-opus-20240229", api_key=os.environ.get("ANTHROPIC_API_KEY", "<your Anthropic API key if not set as an env var>"))
 # response = agent.generate_response("System message", "User message")
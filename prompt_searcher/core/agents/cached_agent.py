@@ -0,0 +1,69 @@
+from prompt_searcher.core.interfaces.agent import Agent
+from prompt_searcher.core.resources.response_cache import ResponseCache
+
+class CachedAgent(Agent):
+    """
+    Agent wrapper that serves repeated requests from a shared ResponseCache.
+
+    Entries are keyed by the agent class, the model, the generation profile and both messages,
+    so agents wrapping the same model can share one cache. Cached responses report no output tokens, since none were spent.
+    """
+
+    def __init__(self, agent: Agent, cache: ResponseCache, namespace: str = None):
+        """
+        Initialize the CachedAgent class.
+
+        Args:
+            agent (Agent): The agent whose responses are cached.
+            cache (ResponseCache): The cache to read from and write to.
+            namespace (str, optional): Prefix of the cache keys. Defaults to the class name of the
+                innermost wrapped agent, such as "OpenAIAgent".
+        """
+        self.agent = agent
+        self.model = agent.model
+        self.profile = agent.profile
+        self.cache = cache
+        if namespace is None:
+            innermost = agent
+            while isinstance(getattr(innermost, "agent", None), Agent):
+                innermost = innermost.agent
+            namespace = type(innermost).__name__
+        self.namespace = namespace
+
+    def __getattr__(self, name):
+        # Expose the wrapped agent's extras, such as get_hedge_stats.
+        if name == "agent" or name.startswith("__"):
+            raise AttributeError(name)
+        return getattr(self.agent, name)
+
+    def generate_response(self, system_message: str, user_message: str) -> str:
+        key = self._cache_key(system_message, user_message)
+        response = self.cache.get(key)
+        if response is None:
+            response = self.agent.generate_response(system_message, user_message)
+            self.cache.set(key, response)
+        return response
+
+    async def agenerate_response(self, system_message: str, user_message: str) -> str:
+        response, _ = await self.agenerate_response_with_usage(system_message, user_message)
+        return response
+
+    async def agenerate_response_with_usage(self, system_message: str, user_message: str) -> tuple[str, int | None]:
+        tokens = None
+
+        async def compute():
+            nonlocal tokens
+            response, tokens = await self.agent.agenerate_response_with_usage(system_message, user_message)
+            return response
+
+        response, _ = await self.cache.get_or_compute(self._cache_key(system_message, user_message), compute)
+        return response, tokens
+
+    async def agenerate_uncoalesced_response_with_usage(self, system_message: str, user_message: str) -> tuple[str, int | None]:
+        # Bypasses the single-flight computation of the cache, but still stores the response.
+        response, tokens = await self.agent.agenerate_uncoalesced_response_with_usage(system_message, user_message)
+        self.cache.set(self._cache_key(system_message, user_message), response)
+        return response, tokens
+
+    def _cache_key(self, system_message: str, user_message: str) -> str:
+        return self.cache.make_key(self.namespace, self.model, self.profile.to_dict(), system_message, user_message)
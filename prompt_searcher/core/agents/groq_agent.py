@@ -1,10 +1,18 @@
 from prompt_searcher.core.interfaces.agent import Agent
-from groq import Groq
+from prompt_searcher.core.utils.loop_local import LoopLocal
+from groq import Groq, AsyncGroq
 
 class GroqAgent(Agent):
     def __init__(self, model: str, api_key: str, **kwargs):
         self.model = model
         self.client = Groq(api_key=api_key, **kwargs)
+        # Async clients are bound to the event loop they are first used in, so each loop gets its own.
+        self._async_clients = LoopLocal(lambda: AsyncGroq(api_key=api_key, **kwargs))
+
+    @property
+    def async_client(self) -> AsyncGroq:
+        """The async client of the running event loop."""
+        return self._async_clients.get()
 
     def generate_response(self, system_message: str, user_message: str) -> str:
         """
@@ -21,13 +29,62 @@ class GroqAgent(Agent):
             {"role": "system", "content": system_message},
             {"role": "user", "content": user_message}
         ]
-
-        completion = self.client.chat.completions.create(
-            model=self.model,
-            messages=messages
-        )
+        options = self.profile.request_options()
+        if self.profile.stream:
+            stream = self.client.chat.completions.create(model=self.model, messages=messages, stream=True, **options)
+            try:
+                return self.profile.collect(chunk.choices[0].delta.content for chunk in stream if chunk.choices)
+            finally:
+                stream.close()
+        completion = self.client.chat.completions.create(model=self.model, messages=messages, **options)
         return completion.choices[0].message.content
 
+    async def agenerate_response(self, system_message: str, user_message: str) -> str:
+        """
+        Asynchronously generate a response from the Groq model.
+
+        Args:
+            system_message (str): The system message providing context to the model.
+            user_message (str): The user message for which the model will generate a response.
+
+        Returns:
+            str: The response generated by the model.
+        """
+        response, _ = await self.agenerate_response_with_usage(system_message, user_message)
+        return response
+
+    async def agenerate_response_with_usage(self, system_message: str, user_message: str) -> tuple[str, int | None]:
+        """
+        Asynchronously generate a response from the Groq model and report its output token count.
+
+        Args:
+            system_message (str): The system message providing context to the model.
+            user_message (str): The user message for which the model will generate a response.
+
+        Returns:
+            tuple[str, int | None]: The response and its output token count, or None if not reported.
+        """
+        messages = [
+            {"role": "system", "content": system_message},
+            {"role": "user", "content": user_message}
+        ]
+        options = self.profile.request_options()
+        if self.profile.stream:
+            # A stream that is cut off early reports no usage.
+            stream = await self.async_client.chat.completions.create(
+                model=self.model, messages=messages, stream=True, **options
+            )
+            try:
+                response = await self.profile.acollect(
+                    chunk.choices[0].delta.content async for chunk in stream if chunk.choices
+                )
+            finally:
+                await stream.close()
+            return response, None
+        completion = await self.async_client.chat.completions.create(model=self.model, messages=messages, **options)
+        tokens = completion.usage.completion_tokens if completion.usage else None
+        return completion.choices[0].message.content, tokens
+
 # Example usage:
 # agent = GroqAgent(model="groq-v1", api_key=os.environ.get("GROQ_API_KEY", "<your Groq API key if not set as an env var>"))
 # response = agent.generate_response("System message", "User message")
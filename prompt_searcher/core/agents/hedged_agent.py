@@ -0,0 +1,165 @@
+import asyncio
+import time
+from collections import deque
+from prompt_searcher.core.interfaces.agent import Agent
+from prompt_searcher.core.interfaces.generation_profile import GenerationProfile
+
+class HedgedAgent(Agent):
+    """
+    Agent wrapper that hedges slow asynchronous requests.
+
+    If a request has not completed after an adaptive percentile of recently observed
+    latencies, a duplicate request is issued and the first response wins; the other one is
+    cancelled. The number of hedges is capped at `max_hedge_ratio` of all requests, and
+    `get_hedge_stats` reports how many extra requests were made.
+
+    Duplicates are sent with `agenerate_uncoalesced_response_with_usage`, so that wrapped
+    agents that merge identical concurrent calls (LocalAgent, CachedAgent) still send them as
+    separate requests.
+
+    Synchronous calls are passed through without hedging.
+    """
+
+    def __init__(self,
+                 agent: Agent,
+                 role: str = "student",
+                 percentile: float = 0.95,
+                 max_hedge_ratio: float = 0.1,
+                 window: int = 200,
+                 min_samples: int = 20):
+        """
+        Initialize the HedgedAgent class.
+
+        Args:
+            agent (Agent): The agent whose requests are hedged.
+            role (str, optional): The role of the agent, used when reporting. Defaults to "student".
+            percentile (float, optional): Latency percentile after which a request is hedged. Defaults to 0.95.
+            max_hedge_ratio (float, optional): Maximum ratio of hedged requests to requests. Defaults to 0.1.
+            window (int, optional): Number of recent latencies the percentile is computed over. Defaults to 200.
+            min_samples (int, optional): Latencies to observe before hedging starts. Defaults to 20.
+        """
+        self.agent = agent
+        self.model = agent.model
+        self.profile = agent.profile
+        self.role = role
+        self.percentile = percentile
+        self.max_hedge_ratio = max_hedge_ratio
+        self.min_samples = min_samples
+        self._latencies = deque(maxlen=window)
+        self.requests = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def with_profile(self, profile: GenerationProfile) -> "HedgedAgent":
+        """
+        Return a copy of this agent that applies a generation profile.
+
+        The copy observes its own latencies and keeps its own hedge budget, since a different
+        profile changes how long requests take.
+
+        Args:
+            profile (GenerationProfile): The generation settings of the copy.
+
+        Returns:
+            HedgedAgent: The copy.
+        """
+        agent = super().with_profile(profile)
+        agent._latencies = deque(maxlen=self._latencies.maxlen)
+        agent.requests = 0
+        agent.hedges = 0
+        agent.hedge_wins = 0
+        return agent
+
+    def generate_response(self, system_message: str, user_message: str) -> str:
+        return self.agent.generate_response(system_message, user_message)
+
+    async def agenerate_response(self, system_message: str, user_message: str) -> str:
+        response, _ = await self.agenerate_response_with_usage(system_message, user_message)
+        return response
+
+    async def agenerate_response_with_usage(self, system_message: str, user_message: str) -> tuple[str, int | None]:
+        """
+        Generate a response, issuing a duplicate request if the first one is slow.
+
+        Args:
+            system_message (str): The system message providing context to the model.
+            user_message (str): The user message for which the model will generate a response.
+
+        Returns:
+            tuple[str, int | None]: The first response to complete and its output token count.
+        """
+        self.requests += 1
+        start = time.perf_counter()
+        tasks = {asyncio.create_task(self.agent.agenerate_response_with_usage(system_message, user_message))}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=self.hedge_delay())
+            if not done and self._may_hedge():
+                self.hedges += 1
+                hedge = asyncio.create_task(
+                    self.agent.agenerate_uncoalesced_response_with_usage(system_message, user_message)
+                )
+                tasks.add(hedge)
+            else:
+                hedge = None
+
+            error = None
+            pending = tasks
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is not None:
+                        error = task.exception()
+                        continue
+                    if task is hedge:
+                        self.hedge_wins += 1
+                    # Latency of the request as a whole, from the first launch. When the hedge
+                    # wins, this is a lower bound of the cancelled original's latency, which
+                    # keeps slow originals in the window instead of the hedge's own fast time.
+                    self._latencies.append(time.perf_counter() - start)
+                    return task.result()
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def agenerate_uncoalesced_response_with_usage(self, system_message: str, user_message: str) -> tuple[str, int | None]:
+        # A duplicate requested by an outer hedge is not hedged again.
+        return await self.agent.agenerate_uncoalesced_response_with_usage(system_message, user_message)
+
+    def hedge_delay(self) -> float | None:
+        """
+        The current hedging delay in seconds.
+
+        Returns:
+            float | None: The configured percentile of recent latencies, or None while fewer
+                than `min_samples` latencies have been observed.
+        """
+        if len(self._latencies) < self.min_samples:
+            return None
+        latencies = sorted(self._latencies)
+        return latencies[int(self.percentile * (len(latencies) - 1))]
+
+    def get_hedge_stats(self) -> dict:
+        """
+        Report how many requests were hedged.
+
+        Returns:
+            dict: `role`, `requests`, `hedges`, `hedge_wins` (hedges that answered first),
+                `hedge_ratio` and the current `hedge_delay`.
+        """
+        return {
+            "role": self.role,
+            "requests": self.requests,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "hedge_ratio": self.hedges / self.requests if self.requests else 0.0,
+            "hedge_delay": self.hedge_delay(),
+        }
+
+    def _may_hedge(self) -> bool:
+        return self.hedges + 1 <= self.max_hedge_ratio * self.requests
+
+# Example usage:
+# student = HedgedAgent(GroqAgent(model="gemma2-9b-it", api_key=GROQ_API_KEY), role="student", max_hedge_ratio=0.05)
+# ... train ...
+# print(student.get_hedge_stats())
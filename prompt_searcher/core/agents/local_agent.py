@@ -0,0 +1,245 @@
+import asyncio
+import httpx
+from openai import OpenAI, AsyncOpenAI, DefaultHttpxClient, DefaultAsyncHttpxClient
+from prompt_searcher.core.interfaces.agent import Agent
+from prompt_searcher.core.interfaces.generation_profile import GenerationProfile
+from prompt_searcher.core.utils.loop_local import LoopLocal
+
+class LocalAgent(Agent):
+    """
+    Agent for a self-hosted OpenAI-compatible server (vLLM, llama.cpp server, Ollama, ...).
+
+    Concurrent asynchronous requests are coalesced: identical in-flight requests share a single
+    server request, and, when a `prompt_template` is given, distinct requests arriving within
+    `batch_window` seconds are sent together as one `/completions` request with a list of
+    prompts, which servers such as vLLM batch natively. Without a template every request goes
+    to `/chat/completions`, so the server applies the model's own chat template. Batched
+    requests apply the generation profile's limits but are never streamed.
+    """
+
+    def __init__(self,
+                 model: str,
+                 base_url: str = "http://localhost:8000/v1",
+                 api_key: str = "local",
+                 timeout: float = 60.0,
+                 max_connections: int = 100,
+                 keepalive_connections: int = 20,
+                 keepalive_expiry: float = 30.0,
+                 prompt_template: str = None,
+                 batch_size: int = 16,
+                 batch_window: float = 0.005,
+                 **kwargs):
+        """
+        Initialize the LocalAgent class.
+
+        Args:
+            model (str): The model name served by the server.
+            base_url (str, optional): Base URL of the OpenAI-compatible API. Defaults to "http://localhost:8000/v1".
+            api_key (str, optional): API key, if the server checks one. Defaults to "local".
+            timeout (float, optional): Request timeout in seconds. Defaults to 60.0.
+            max_connections (int, optional): Maximum number of open connections. Defaults to 100.
+            keepalive_connections (int, optional): Maximum number of idle keep-alive connections. Defaults to 20.
+            keepalive_expiry (float, optional): Seconds an idle connection is kept alive. Defaults to 30.0.
+            prompt_template (str, optional): Template with `{system_message}` and `{user_message}`
+                placeholders used to render batched `/completions` prompts. Batching is disabled when None.
+            batch_size (int, optional): Maximum number of prompts per batched request. Defaults to 16.
+            batch_window (float, optional): Seconds to wait for more requests before sending a batch. Defaults to 0.005.
+        """
+        self.model = model
+        self.base_url = base_url
+        self.prompt_template = prompt_template
+        self.batch_size = batch_size
+        self.batch_window = batch_window
+        limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=keepalive_connections,
+            keepalive_expiry=keepalive_expiry
+        )
+        self.client = OpenAI(
+            base_url=base_url, api_key=api_key, timeout=timeout,
+            http_client=DefaultHttpxClient(limits=limits), **kwargs
+        )
+        # Async connection pools are bound to the event loop they are first used in, so each loop
+        # gets its own client.
+        self._async_clients = LoopLocal(lambda: AsyncOpenAI(
+            base_url=base_url, api_key=api_key, timeout=timeout,
+            http_client=DefaultAsyncHttpxClient(limits=limits), **kwargs
+        ))
+        self.server_requests = 0
+        self._in_flight = {}
+        self._pending_batch = []
+        self._batch_handle = None
+        self._batch_tasks = set()
+
+    def with_profile(self, profile: GenerationProfile) -> "LocalAgent":
+        """
+        Return a copy of this agent that applies a generation profile.
+
+        The copy shares the connection pools of this agent, but coalesces and batches its
+        requests separately, since requests with different profiles cannot share a response.
+
+        Args:
+            profile (GenerationProfile): The generation settings of the copy.
+
+        Returns:
+            LocalAgent: The copy.
+        """
+        agent = super().with_profile(profile)
+        agent._in_flight = {}
+        agent._pending_batch = []
+        agent._batch_handle = None
+        agent._batch_tasks = set()
+        return agent
+
+    @property
+    def async_client(self) -> AsyncOpenAI:
+        """The async client of the running event loop."""
+        return self._async_clients.get()
+
+    def generate_response(self, system_message: str, user_message: str) -> str:
+        """
+        Generate a response from the local model.
+
+        Args:
+            system_message (str): The system message providing context to the model.
+            user_message (str): The user message for which the model will generate a response.
+
+        Returns:
+            str: The response generated by the model.
+        """
+        self.server_requests += 1
+        messages = [
+            {"role": "system", "content": system_message},
+            {"role": "user", "content": user_message}
+        ]
+        options = self.profile.request_options()
+        if self.profile.stream:
+            stream = self.client.chat.completions.create(model=self.model, messages=messages, stream=True, **options)
+            try:
+                return self.profile.collect(chunk.choices[0].delta.content for chunk in stream if chunk.choices)
+            finally:
+                stream.close()
+        completion = self.client.chat.completions.create(model=self.model, messages=messages, **options)
+        return completion.choices[0].message.content
+
+    async def agenerate_response(self, system_message: str, user_message: str) -> str:
+        """
+        Asynchronously generate a response from the local model.
+
+        Args:
+            system_message (str): The system message providing context to the model.
+            user_message (str): The user message for which the model will generate a response.
+
+        Returns:
+            str: The response generated by the model.
+        """
+        response, _ = await self.agenerate_response_with_usage(system_message, user_message)
+        return response
+
+    async def agenerate_response_with_usage(self, system_message: str, user_message: str) -> tuple[str, int | None]:
+        """
+        Asynchronously generate a response, sharing the server request with identical concurrent calls.
+
+        Args:
+            system_message (str): The system message providing context to the model.
+            user_message (str): The user message for which the model will generate a response.
+
+        Returns:
+            tuple[str, int | None]: The response and its output token count, or None for batched
+                requests, whose usage is only reported for the whole batch.
+        """
+        key = (system_message, user_message)
+        request = self._in_flight.get(key)
+        if request is None:
+            request = asyncio.ensure_future(self._request(system_message, user_message))
+            self._in_flight[key] = request
+            request.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        # Shielded so that a cancelled caller does not cancel the request for the others.
+        return await asyncio.shield(request)
+
+    async def agenerate_uncoalesced_response_with_usage(self, system_message: str, user_message: str) -> tuple[str, int | None]:
+        """
+        Asynchronously generate a response with a server request that is not shared with identical calls.
+
+        Args:
+            system_message (str): The system message providing context to the model.
+            user_message (str): The user message for which the model will generate a response.
+
+        Returns:
+            tuple[str, int | None]: The response and its output token count, or None for batched requests.
+        """
+        return await self._request(system_message, user_message)
+
+    async def _request(self, system_message: str, user_message: str) -> tuple[str, int | None]:
+        if self.prompt_template is not None:
+            return await self._enqueue(
+                self.prompt_template.format(system_message=system_message, user_message=user_message)
+            )
+        self.server_requests += 1
+        messages = [
+            {"role": "system", "content": system_message},
+            {"role": "user", "content": user_message}
+        ]
+        options = self.profile.request_options()
+        if self.profile.stream:
+            # A stream that is cut off early reports no usage.
+            stream = await self.async_client.chat.completions.create(
+                model=self.model, messages=messages, stream=True, **options
+            )
+            try:
+                response = await self.profile.acollect(
+                    chunk.choices[0].delta.content async for chunk in stream if chunk.choices
+                )
+            finally:
+                await stream.close()
+            return response, None
+        completion = await self.async_client.chat.completions.create(model=self.model, messages=messages, **options)
+        tokens = completion.usage.completion_tokens if completion.usage else None
+        return completion.choices[0].message.content, tokens
+
+    async def _enqueue(self, prompt: str) -> tuple[str, int | None]:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending_batch.append((prompt, future))
+        if len(self._pending_batch) >= self.batch_size:
+            self._send_pending_batch()
+        elif self._batch_handle is None:
+            self._batch_handle = loop.call_later(self.batch_window, self._send_pending_batch)
+        return await future
+
+    def _send_pending_batch(self):
+        if self._batch_handle is not None:
+            self._batch_handle.cancel()
+            self._batch_handle = None
+        batch, self._pending_batch = self._pending_batch, []
+        if batch:
+            task = asyncio.ensure_future(self._send_batch(batch))
+            self._batch_tasks.add(task)
+            task.add_done_callback(self._batch_tasks.discard)
+
+    async def _send_batch(self, batch: list):
+        self.server_requests += 1
+        try:
+            completion = await self.async_client.completions.create(
+                model=self.model,
+                prompt=[prompt for prompt, _ in batch],
+                **self.profile.request_options()
+            )
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        texts = {choice.index: choice.text for choice in completion.choices}
+        for index, (_, future) in enumerate(batch):
+            if future.done():
+                continue
+            if index in texts:
+                future.set_result((texts[index], None))
+            else:
+                future.set_exception(ValueError(f"The server returned no completion for batched prompt {index}"))
+
+# Example usage:
+# agent = LocalAgent(model="meta-llama/Llama-3.2-1B-Instruct", base_url="http://localhost:8000/v1")
+# response = agent.generate_response("System message", "User message")
+# print(response)
@@ -0,0 +1,45 @@
+from prompt_searcher.core.interfaces.agent import Agent
+from prompt_searcher.core.resources.rate_limiter import RateLimiter
+
+class RateLimitedAgent(Agent):
+    """
+    Agent wrapper that schedules asynchronous requests through a shared RateLimiter.
+
+    Synchronous calls are passed through without scheduling.
+    """
+
+    def __init__(self, agent: Agent, rate_limiter: RateLimiter, key: str = None):
+        """
+        Initialize the RateLimitedAgent class.
+
+        Args:
+            agent (Agent): The agent whose requests are scheduled.
+            rate_limiter (RateLimiter): The scheduler shared with other agents.
+            key (str, optional): The rate limiter key of this agent. Defaults to the model name.
+        """
+        self.agent = agent
+        self.model = agent.model
+        self.profile = agent.profile
+        self.rate_limiter = rate_limiter
+        self.key = key if key is not None else agent.model
+
+    def __getattr__(self, name):
+        # Expose the wrapped agent's extras, such as get_hedge_stats.
+        if name == "agent" or name.startswith("__"):
+            raise AttributeError(name)
+        return getattr(self.agent, name)
+
+    def generate_response(self, system_message: str, user_message: str) -> str:
+        return self.agent.generate_response(system_message, user_message)
+
+    async def agenerate_response(self, system_message: str, user_message: str) -> str:
+        response, _ = await self.agenerate_response_with_usage(system_message, user_message)
+        return response
+
+    async def agenerate_response_with_usage(self, system_message: str, user_message: str) -> tuple[str, int | None]:
+        async with self.rate_limiter.limit(self.key):
+            return await self.agent.agenerate_response_with_usage(system_message, user_message)
+
+    async def agenerate_uncoalesced_response_with_usage(self, system_message: str, user_message: str) -> tuple[str, int | None]:
+        async with self.rate_limiter.limit(self.key):
+            return await self.agent.agenerate_uncoalesced_response_with_usage(system_message, user_message)
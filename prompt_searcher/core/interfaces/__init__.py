@@ -1,2 +1,3 @@
 from .agent import Agent
+from .generation_profile import GenerationProfile
 from .loss import LossFunction
\ No newline at end of file
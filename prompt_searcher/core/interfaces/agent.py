@@ -1,8 +1,34 @@
+import asyncio
+import copy
+from prompt_searcher.core.interfaces.generation_profile import GenerationProfile
+
 class Agent:
+    # Generation settings of every request; see with_profile.
+    profile = GenerationProfile()
+
     def __init__(self, model: str, api_key: str, client):
         self.model = model
         self.client = client(api_key=api_key)
 
+    def with_profile(self, profile: GenerationProfile) -> "Agent":
+        """
+        Return a copy of this agent that applies a generation profile.
+
+        The copy shares the clients of this agent, so the same agent can serve several roles
+        with different profiles. Wrapper agents apply the profile to the agent they wrap.
+
+        Args:
+            profile (GenerationProfile): The generation settings of the copy.
+
+        Returns:
+            Agent: The copy.
+        """
+        agent = copy.copy(self)
+        agent.profile = profile
+        if isinstance(getattr(self, "agent", None), Agent):
+            agent.agent = self.agent.with_profile(profile)
+        return agent
+
     def generate_response(self, system_message: str, user_message: str) -> str:
         """
         Generate a response from the model.
@@ -14,4 +40,87 @@ class Agent:
         Returns:
             str: The response generated by the model.
         """
-        raise NotImplementedError("This method should be overridden by subclasses")
\ No newline at end of file
+        raise NotImplementedError("This method should be overridden by subclasses")
+
+    async def agenerate_response(self, system_message: str, user_message: str) -> str:
+        """
+        Asynchronously generate a response from the model.
+
+        The default implementation runs `generate_response` in a worker thread, so agents
+        that only implement the synchronous method can still be driven from an event loop.
+        Subclasses backed by an async client should override it.
+
+        Args:
+            system_message (str): The system message providing context to the model.
+            user_message (str): The user message for which the model will generate a response.
+
+        Returns:
+            str: The response generated by the model.
+        """
+        return await asyncio.to_thread(self.generate_response, system_message, user_message)
+
+    async def agenerate_response_with_usage(self, system_message: str, user_message: str) -> tuple[str, int | None]:
+        """
+        Asynchronously generate a response and report how many output tokens it used.
+
+        The default implementation calls `agenerate_response` and reports no usage.
+        Subclasses whose API returns token usage should override it.
+
+        Args:
+            system_message (str): The system message providing context to the model.
+            user_message (str): The user message for which the model will generate a response.
+
+        Returns:
+            tuple[str, int | None]: The response and its output token count, or None if unknown.
+        """
+        return await self.agenerate_response(system_message, user_message), None
+
+    async def agenerate_uncoalesced_response_with_usage(self, system_message: str, user_message: str) -> tuple[str, int | None]:
+        """
+        Asynchronously generate a response with a request of its own.
+
+        Agents that merge identical concurrent calls into one request (such as LocalAgent, or
+        CachedAgent through its cache) override this to send a separate request anyway. It is
+        used by HedgedAgent for duplicate requests, which would otherwise just wait for the
+        request they are meant to race. The default implementation calls
+        `agenerate_response_with_usage`.
+
+        Args:
+            system_message (str): The system message providing context to the model.
+            user_message (str): The user message for which the model will generate a response.
+
+        Returns:
+            tuple[str, int | None]: The response and its output token count, or None if unknown.
+        """
+        return await self.agenerate_response_with_usage(system_message, user_message)
+
+    async def generate_many(self,
+                            requests: list[tuple[str, str]],
+                            max_concurrency: int = 8,
+                            return_exceptions: bool = False) -> list:
+        """
+        Generate responses for many (system_message, user_message) pairs.
+
+        The default implementation gathers `agenerate_response` calls with at most
+        `max_concurrency` requests in flight. Subclasses can override it with a native
+        bulk implementation.
+
+        Args:
+            requests (list[tuple[str, str]]): The (system_message, user_message) pairs.
+            max_concurrency (int, optional): Maximum number of requests in flight. Defaults to 8.
+            return_exceptions (bool, optional): Return exceptions in place of failed responses
+                instead of raising the first one. Defaults to False.
+
+        Returns:
+            list: The responses, in the same order as `requests`.
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def run(system_message: str, user_message: str) -> str:
+            async with semaphore:
+                return await self.agenerate_response(system_message, user_message)
+
+        return await asyncio.gather(
+            *(run(system_message, user_message) for system_message, user_message in requests),
+            return_exceptions=return_exceptions
+        )
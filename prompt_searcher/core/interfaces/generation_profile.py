@@ -0,0 +1,134 @@
+import copy
+
+class GenerationProfile:
+    """
+    Generation settings applied by an agent to every request it sends.
+
+    Fields left as None are not sent, so the provider's defaults apply. With `stream=True`
+    the response is streamed and the stream is closed as soon as `max_chars` characters or
+    a stop sequence have been received, which bounds long-winded answers even on servers
+    that ignore `max_tokens`.
+    """
+
+    def __init__(self,
+                 max_tokens: int = None,
+                 stop: list[str] = None,
+                 temperature: float = None,
+                 timeout: float = None,
+                 stream: bool = False,
+                 max_chars: int = None,
+                 seed: int = None):
+        """
+        Initialize the GenerationProfile class.
+
+        Args:
+            max_tokens (int, optional): Maximum number of output tokens. Defaults to None.
+            stop (list[str], optional): Sequences that end the response. Defaults to None.
+            temperature (float, optional): Sampling temperature. Defaults to None.
+            timeout (float, optional): Request timeout in seconds. Defaults to None.
+            stream (bool, optional): Stream the response, cutting it off early. Defaults to False.
+            max_chars (int, optional): Characters after which a streamed response is cut off. Defaults to None.
+            seed (int, optional): Sampling seed, for providers that support one. Defaults to None.
+        """
+        self.max_tokens = max_tokens
+        self.stop = list(stop) if stop else None
+        self.temperature = temperature
+        self.timeout = timeout
+        self.stream = stream
+        self.max_chars = max_chars
+        self.seed = seed
+
+    def replace(self, **changes) -> "GenerationProfile":
+        """
+        Return a copy of this profile with some fields changed.
+
+        Returns:
+            GenerationProfile: The copy.
+        """
+        profile = copy.copy(self)
+        for name, value in changes.items():
+            if not hasattr(profile, name):
+                raise AttributeError(f"GenerationProfile has no field {name!r}")
+            setattr(profile, name, value)
+        return profile
+
+    def request_options(self) -> dict:
+        """
+        Request options in the format of OpenAI-compatible APIs.
+
+        Returns:
+            dict: `max_tokens`, `stop`, `temperature`, `seed` and `timeout`, for the fields that are set.
+        """
+        options = {
+            "max_tokens": self.max_tokens,
+            "stop": self.stop,
+            "temperature": self.temperature,
+            "seed": self.seed,
+            "timeout": self.timeout,
+        }
+        return {name: value for name, value in options.items() if value is not None}
+
+    def to_dict(self) -> dict:
+        """
+        The fields that affect the generated text, used in cache keys.
+
+        Returns:
+            dict: Every field except `timeout`.
+        """
+        return {
+            "max_tokens": self.max_tokens,
+            "stop": self.stop,
+            "temperature": self.temperature,
+            "stream": self.stream,
+            "max_chars": self.max_chars,
+            "seed": self.seed,
+        }
+
+    def collect(self, chunks) -> str:
+        """
+        Join streamed text chunks, stopping at the cut-off.
+
+        Args:
+            chunks: An iterable of text chunks (None chunks are skipped).
+
+        Returns:
+            str: The response, cut at the first stop sequence or at `max_chars`.
+        """
+        text = ""
+        for chunk in chunks:
+            text += chunk or ""
+            text, done = self._cut(text)
+            if done:
+                break
+        return text
+
+    async def acollect(self, chunks) -> str:
+        """
+        Join asynchronously streamed text chunks, stopping at the cut-off.
+
+        Args:
+            chunks: An async iterable of text chunks (None chunks are skipped).
+
+        Returns:
+            str: The response, cut at the first stop sequence or at `max_chars`.
+        """
+        text = ""
+        async for chunk in chunks:
+            text += chunk or ""
+            text, done = self._cut(text)
+            if done:
+                break
+        return text
+
+    def _cut(self, text: str) -> tuple[str, bool]:
+        for sequence in self.stop or []:
+            position = text.find(sequence)
+            if position != -1:
+                return text[:position], True
+        if self.max_chars is not None and len(text) >= self.max_chars:
+            return text[:self.max_chars], True
+        return text, False
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{name}={value!r}" for name, value in vars(self).items() if value not in (None, False))
+        return f"GenerationProfile({fields})"
@@ -1,4 +1,10 @@
+import asyncio
+
 class LossFunction:
+    # Best score a single row can get, if the scale has one (10 for a 1-10 judge). Rows below
+    # it are shown to the augmentator as failures.
+    max_row_score = None
+
     def score(self, y_pred, y_true) -> int:
         """
         Calculate the loss score between predicted and true values.
@@ -12,6 +18,63 @@ class LossFunction:
         """
         raise NotImplementedError("This method should be overridden by subclasses")
 
+    async def ascore(self, y_pred, y_true) -> int:
+        """
+        Asynchronously calculate the loss score between predicted and true values.
+
+        The default implementation runs `score` in a worker thread.
+
+        Args:
+            y_pred: The predicted values.
+            y_true: The true values.
+
+        Returns:
+            int: The calculated loss score.
+        """
+        return await asyncio.to_thread(self.score, y_pred, y_true)
+
+    async def ascore_row(self, pred, true):
+        """
+        Asynchronously score a single predicted value against its true value.
+
+        Loss functions that implement this method together with `aggregate` can be
+        evaluated row by row, as soon as each prediction is available.
+
+        Args:
+            pred: The predicted value.
+            true: The true value.
+
+        Returns:
+            The row score, or None if it could not be determined.
+        """
+        raise NotImplementedError("This method should be overridden by subclasses")
+
+    def aggregate(self, row_scores: list, weights: list = None) -> float:
+        """
+        Combine row scores produced by `ascore_row` into a single loss score.
+
+        Args:
+            row_scores (list): The row scores, None for rows that could not be scored.
+            weights (list, optional): Weights for a sample of the dataset, such that the weighted
+                sum of the row scores estimates the full-set mean. Weights can be negative, as the
+                row sampler adds control terms for its estimate. Defaults to None (the rows are
+                the full set).
+
+        Returns:
+            float: The aggregated loss score.
+        """
+        raise NotImplementedError("This method should be overridden by subclasses")
+
+    def supports_row_scoring(self) -> bool:
+        """
+        Whether this loss function implements `ascore_row` and `aggregate`.
+
+        Returns:
+            bool: True if rows can be scored individually.
+        """
+        return (type(self).ascore_row is not LossFunction.ascore_row
+                and type(self).aggregate is not LossFunction.aggregate)
+
     def winner(self, previous_loss, new_loss) -> bool:
         """
         Compare two loss scores and return the better one.
@@ -1,24 +1,38 @@
 from prompt_searcher.core.interfaces.loss import LossFunction
 from prompt_searcher.core.interfaces.agent import Agent
+from prompt_searcher.core.interfaces.generation_profile import GenerationProfile
+from prompt_searcher.core.learning.failure_selection import select_failures
 
 class Backpropagation:
-    def __init__(self, augmentator: Agent, desired_output: str = None):
+    def __init__(self,
+                 augmentator: Agent,
+                 desired_output: str = None,
+                 max_failures: int = 5,
+                 failure_token_budget: int = 600,
+                 profile: GenerationProfile = None):
         """
         Initialize the Backpropagation class.
 
         Args:
             augmentator (Agent): An agent used for augmenting and optimizing prompts.
             desired_output (str, optional): The desired output for the prompt optimization. Defaults to None.
+            max_failures (int, optional): Maximum number of failed rows shown to the augmentator. Defaults to 5.
+            failure_token_budget (int, optional): Estimated token budget for the failed rows. Defaults to 600.
+            profile (GenerationProfile, optional): Generation profile applied to the augmentator. Defaults to
+                None (the augmentator's own profile).
 
             Desired output is optional, but it can be used to guide the optimization process towards a specific output.
         """
-        self.model = augmentator
+        self.model = augmentator if profile is None else augmentator.with_profile(profile)
         self.desired_output = desired_output
+        self.max_failures = max_failures
+        self.failure_token_budget = failure_token_budget
 
     def optimize_prompt(self,
                         current_prompt: str,
                         score: int,
-                        previous_prompt: str):
+                        previous_prompt: str,
+                        failures: list[tuple] = None):
         """
         Optimize the given prompt based on the current score and previous prompt.
 
@@ -29,6 +43,9 @@ class Backpropagation:
             current_prompt (str): The current prompt to be optimized.
             score (int): The current score of the prompt based on the evaluation criteria.
             previous_prompt (str): The previous prompt that didn't improve the score.
+            failures (list[tuple], optional): (input, expected, actual, score) rows the last tested
+                prompt did badly on, ordered worst first. A small, diverse selection of them that fits
+                the token budget is shown to the augmentator. Defaults to None.
 
         Returns:
             str: An optimized version of the prompt.
@@ -43,6 +60,45 @@ class Backpropagation:
         The optimized prompt is returned as a string, ready for production use without any additional explanations or examples.
         """
 
+        system_message, user_message = self._build_messages(current_prompt, score, previous_prompt, failures)
+        optimized_prompt = self.model.generate_response(system_message, user_message).strip()
+        return optimized_prompt
+
+    async def aoptimize_prompt(self,
+                               current_prompt: str,
+                               score: int,
+                               previous_prompt: str,
+                               failures: list[tuple] = None):
+        """
+        Asynchronous counterpart of `optimize_prompt`, using the augmentator's async API.
+
+        Args:
+            current_prompt (str): The current prompt to be optimized.
+            score (int): The current score of the prompt based on the evaluation criteria.
+            previous_prompt (str): The previous prompt that didn't improve the score.
+            failures (list[tuple], optional): (input, expected, actual, score) rows the last tested
+                prompt did badly on, ordered worst first. A small, diverse selection of them that fits
+                the token budget is shown to the augmentator. Defaults to None.
+
+        Returns:
+            str: An optimized version of the prompt.
+        """
+        system_message, user_message = self._build_messages(current_prompt, score, previous_prompt, failures)
+        optimized_prompt = (await self.model.agenerate_response(system_message, user_message)).strip()
+        return optimized_prompt
+
+    def _build_messages(self,
+                        current_prompt: str,
+                        score: int,
+                        previous_prompt: str,
+                        failures: list[tuple] = None) -> tuple[str, str]:
+        """
+        Build the system and user messages sent to the augmentator.
+
+        Returns:
+            tuple[str, str]: The (system_message, user_message) pair.
+        """
+        failure_examples = self._format_failures(failures) if failures else ""
         computed_score_natural = f"The current score of the prompt based on the criteria is: {score}"
         system_message = "You are an AI assistant tasked with improving a prompt. Your goal is to create an enhanced version of the given prompt that better aligns with the desired outputs. Ensure consistency and remove any contradictions in the system prompt."
         user_message = f"""The best current prompt is: {current_prompt}
@@ -52,6 +108,8 @@ class Backpropagation:
 
         {f"The previous prompt was: {previous_prompt}.\n" if previous_prompt else ""}
 
+        {f"These are inputs where the last tested prompt fell short. Use them to understand its failure modes, but do not copy them into the new prompt:\n{failure_examples}\n" if failure_examples else ""}
+
         The previous prompt did not improve the score. Analyze why it didn't work and create a new, better prompt. Avoid repeating the mistakes of the previous prompt.
 
         Please provide an optimized version of the current prompt that will generate better responses for similar types of inputs. Use advanced prompt engineering techniques to improve performance, including but not limited to:
@@ -73,9 +131,7 @@ class Backpropagation:
         {f"Remember that the desired output is: {self.desired_output}" if self.desired_output else ""}
 
         The optimized prompt is:"""
-
-        optimized_prompt = self.model.generate_response(system_message, user_message).strip()
-        return optimized_prompt
+        return system_message, user_message
 
     def _format_list(self, items: list[str]) -> str:
         """
@@ -92,3 +148,19 @@ class Backpropagation:
             Output: "- apple\n- banana\n- cherry"
         """
         return "\n".join(f"- {item}" for item in items)
+
+    def _format_failures(self, failures: list[tuple]) -> str:
+        """
+        Select failed rows within the token budget and format them as a list.
+
+        Args:
+            failures (list[tuple]): (input, expected, actual, score) rows, ordered worst first.
+
+        Returns:
+            str: The selected rows, one per line, or an empty string if none fit.
+        """
+        selected = select_failures(failures, max_failures=self.max_failures, token_budget=self.failure_token_budget)
+        return self._format_list([
+            f"Input: {input_text} | Expected: {expected} | Actual: {actual} | Score: {score}"
+            for input_text, expected, actual, score in selected
+        ])
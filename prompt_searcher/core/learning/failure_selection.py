@@ -0,0 +1,71 @@
+import re
+
+def estimate_tokens(text: str) -> int:
+    """
+    Roughly estimate the number of tokens in a text (about four characters per token).
+
+    Args:
+        text (str): The text to measure.
+
+    Returns:
+        int: The estimated number of tokens.
+    """
+    return max(1, len(text) // 4)
+
+def select_failures(failures: list[tuple],
+                    max_failures: int = 5,
+                    token_budget: int = 600,
+                    similarity_threshold: float = 0.6,
+                    max_field_chars: int = 300) -> list[tuple]:
+    """
+    Select a small, diverse set of failed rows to show the augmentator.
+
+    Rows are taken worst first. A row is skipped when its input is too similar to the input of
+    an already selected row, or when it does not fit in the remaining token budget. Long fields
+    are truncated to `max_field_chars` characters.
+
+    Args:
+        failures (list[tuple]): (input, expected, actual, score) tuples, ordered worst first.
+        max_failures (int, optional): Maximum number of rows to select. Defaults to 5.
+        token_budget (int, optional): Maximum estimated tokens of the selected rows. Defaults to 600.
+        similarity_threshold (float, optional): Word Jaccard similarity of two inputs above which
+            the later row is skipped. Defaults to 0.6.
+        max_field_chars (int, optional): Maximum characters kept per field. Defaults to 300.
+
+    Returns:
+        list[tuple]: The selected (input, expected, actual, score) tuples, with truncated fields.
+    """
+    selected = []
+    selected_words = []
+    remaining_budget = token_budget
+    for input_text, expected, actual, score in failures:
+        if len(selected) >= max_failures:
+            break
+        words = _words(input_text)
+        if any(_jaccard(words, other) > similarity_threshold for other in selected_words):
+            continue
+        row = (
+            _truncate(input_text, max_field_chars),
+            _truncate(expected, max_field_chars),
+            _truncate(actual, max_field_chars),
+            score,
+        )
+        cost = estimate_tokens(" ".join(str(field) for field in row))
+        if cost > remaining_budget:
+            continue
+        selected.append(row)
+        selected_words.append(words)
+        remaining_budget -= cost
+    return selected
+
+def _words(text: str) -> set:
+    return set(re.findall(r"\w+", str(text).lower()))
+
+def _jaccard(a: set, b: set) -> float:
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+def _truncate(text: str, max_chars: int) -> str:
+    text = str(text)
+    return text if len(text) <= max_chars else text[:max_chars] + "..."
@@ -0,0 +1,239 @@
+import asyncio
+import difflib
+import math
+import re
+from prompt_searcher.core.interfaces.agent import Agent
+from prompt_searcher.core.interfaces.generation_profile import GenerationProfile
+from prompt_searcher.core.loss.naive_similarity import NaiveSimilarity
+from prompt_searcher.core.utils.run_sync import run_sync
+
+class ScoreEstimate(float):
+    """
+    A score together with the variance of its estimate.
+
+    Behaves as a plain float everywhere else, so estimates flow through PromptSearch, the
+    results store and the row sampler unchanged.
+    """
+
+    def __new__(cls, value: float, variance: float = 0.0, samples: int = 1):
+        estimate = super().__new__(cls, value)
+        estimate.variance = variance
+        estimate.samples = samples
+        return estimate
+
+    @property
+    def stderr(self) -> float:
+        return math.sqrt(self.variance)
+
+class AdaptiveSimilarity(NaiveSimilarity):
+
+    def __init__(self,
+                 evaluator: Agent,
+                 system_message: str = None,
+                 max_concurrency: int = 8,
+                 profile: GenerationProfile = None,
+                 max_samples: int = 5,
+                 borderline: tuple[int, int] = (4, 7),
+                 disagreement: float = 4.0,
+                 stable_stderr: float = 0.5,
+                 sample_temperature: float = 0.7,
+                 noise_margin: float = 1.0,
+                 min_margin: float = 0.01,
+                 prior_variance: float = 1.0):
+        """
+        Initialize the AdaptiveSimilarity class.
+
+        Judges every row once, like NaiveSimilarity, and asks for more verdicts only when the
+        first one is unparsable, borderline, or far from a cheap local pre-score of the answer
+        (numeric match, or text similarity). Sampling stops once the standard error of the row
+        estimate is at most `stable_stderr`, or after `max_samples` verdicts. Row and loss scores
+        are ScoreEstimate values carrying their variance, and `winner` only accepts a new score
+        that beats the previous one by more than `noise_margin` standard errors.
+
+        The variance of a single verdict is not observable, so row variances are shrunk towards
+        the pooled within-row variance of the resampled rows (`prior_variance` until a row has
+        been resampled): a row judged once gets that pooled variance.
+
+        Args:
+            evaluator (Agent): The agent that judges the answers.
+            system_message (str, optional): The judge's system message. Defaults to NaiveSimilarity's.
+            max_concurrency (int, optional): Maximum number of judge requests in flight. Defaults to 8.
+            profile (GenerationProfile, optional): Generation profile applied to the evaluator. Defaults to None.
+            max_samples (int, optional): Maximum number of verdicts per row. Defaults to 5.
+            borderline (tuple[int, int], optional): Verdicts in this inclusive range are resampled. Defaults to (4, 7).
+            disagreement (float, optional): Distance from the pre-score above which a verdict is
+                resampled. Defaults to 4.0.
+            stable_stderr (float, optional): Standard error at which a row estimate is considered
+                stable. Defaults to 0.5.
+            sample_temperature (float, optional): Temperature of the extra verdicts. Defaults to 0.7.
+            noise_margin (float, optional): Standard errors by which a new score must win. Defaults to 1.0.
+            min_margin (float, optional): Smallest difference by which a new score must win. Defaults to 0.01.
+            prior_variance (float, optional): Variance of a single verdict before any row has
+                been resampled. Defaults to 1.0.
+        """
+        super().__init__(evaluator, system_message=system_message, max_concurrency=max_concurrency, profile=profile)
+        self.max_samples = max_samples
+        self.borderline = borderline
+        self.disagreement = disagreement
+        self.stable_stderr = stable_stderr
+        self.noise_margin = noise_margin
+        self.min_margin = min_margin
+        self.sample_temperature = sample_temperature
+        self.prior_variance = prior_variance
+        self.rows = 0
+        self.resampled_rows = 0
+        self.verdicts = 0
+        self._squared_deviations = 0.0
+        self._degrees_of_freedom = 0
+        self._sample_models = None
+        self._sample_models_source = None
+
+    def score(self, y_pred: list[str], y_true: list[str]) -> float:
+        return run_sync(self.ascore(y_pred, y_true))
+
+    async def ascore(self, y_pred: list[str], y_true: list[str]) -> float:
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def run(pred: str, true: str) -> ScoreEstimate | None:
+            async with semaphore:
+                return await self.ascore_row(pred, true)
+
+        row_scores = await asyncio.gather(*(run(pred, true) for pred, true in zip(y_pred, y_true)))
+        average_score = self.aggregate(row_scores)
+        self.score_history.append(average_score)
+        return average_score
+
+    async def ascore_row(self, pred: str, true: str) -> ScoreEstimate | None:
+        """
+        Estimate the score of a row from one or more verdicts.
+
+        Args:
+            pred (str): The student's answer.
+            true (str): The desired answer.
+
+        Returns:
+            ScoreEstimate | None: The mean verdict and the variance of that mean, or None if no
+                verdict could be parsed.
+        """
+        user_message = self._build_user_message(pred, true)
+        first = self._parse_score(await self.model.agenerate_response(self.system_message, user_message))
+        verdicts = [] if first is None else [first]
+        self.rows += 1
+        self.verdicts += 1
+        if not self._needs_more_samples(first, pred, true):
+            return None if first is None else self._estimate(verdicts)
+
+        self.resampled_rows += 1
+        for model in self.sample_models():
+            verdict = self._parse_score(await model.agenerate_response(self.system_message, user_message))
+            self.verdicts += 1
+            if verdict is not None:
+                verdicts.append(verdict)
+            if len(verdicts) >= 2 and math.sqrt(self._variance_of_mean(verdicts)) <= self.stable_stderr:
+                break
+        if not verdicts:
+            return None
+        if len(verdicts) >= 2:
+            mean = sum(verdicts) / len(verdicts)
+            self._squared_deviations += sum((verdict - mean) ** 2 for verdict in verdicts)
+            self._degrees_of_freedom += len(verdicts) - 1
+        return self._estimate(verdicts)
+
+    def sample_models(self) -> list[Agent]:
+        """
+        The agents that give the extra verdicts, built from the current evaluator.
+
+        They are rebuilt whenever the evaluator is replaced (for example by the shared, cached and
+        rate-limited agent of an ExperimentRunner), so extra verdicts go through the same wrappers.
+
+        Returns:
+            list[Agent]: One agent per extra verdict.
+        """
+        if self._sample_models_source is not self.model:
+            # Every extra verdict has its own seed, so that cached agents do not return the same one.
+            self._sample_models = [
+                self.model.with_profile(self.model.profile.replace(temperature=self.sample_temperature, seed=sample))
+                for sample in range(1, self.max_samples)
+            ]
+            self._sample_models_source = self.model
+        return self._sample_models
+
+    def verdict_variance(self) -> float:
+        """
+        The pooled within-row variance of a single verdict.
+
+        Returns:
+            float: The pooled variance of the resampled rows, or `prior_variance` before any.
+        """
+        if self._degrees_of_freedom == 0:
+            return self.prior_variance
+        return self._squared_deviations / self._degrees_of_freedom
+
+    def aggregate(self, row_scores: list[float | None], weights: list[float] = None) -> ScoreEstimate:
+        # Unparsable rows count as zero with no variance, as in NaiveSimilarity.
+        variances = [getattr(score, "variance", 0.0) for score in row_scores if score is not None]
+        if weights is None:
+            value = sum(score for score in row_scores if score is not None) / len(row_scores)
+            return ScoreEstimate(value, sum(variances) / len(row_scores) ** 2, len(row_scores))
+        value = sum(weight * score for score, weight in zip(row_scores, weights) if score is not None)
+        variance = sum(
+            weight * weight * getattr(score, "variance", 0.0)
+            for score, weight in zip(row_scores, weights) if score is not None
+        )
+        return ScoreEstimate(value, variance, len(row_scores))
+
+    def winner(self, previous_loss, new_loss) -> bool:
+        margin = self.noise_margin * math.sqrt(
+            getattr(previous_loss, "variance", 0.0) + getattr(new_loss, "variance", 0.0)
+        )
+        return new_loss - previous_loss > max(margin, self.min_margin)
+
+    def get_sample_stats(self) -> dict:
+        """
+        Report how many verdicts the judge requested.
+
+        Returns:
+            dict: `rows` judged, `resampled_rows`, `verdicts` and `verdicts_per_row`.
+        """
+        return {
+            "rows": self.rows,
+            "resampled_rows": self.resampled_rows,
+            "verdicts": self.verdicts,
+            "verdicts_per_row": self.verdicts / self.rows if self.rows else 0.0,
+        }
+
+    def _needs_more_samples(self, verdict: int | None, pred: str, true: str) -> bool:
+        if self.max_samples < 2:
+            return False
+        if verdict is None:
+            return True
+        low, high = self.borderline
+        if low <= verdict <= high:
+            return True
+        return abs(verdict - self._pre_score(pred, true)) > self.disagreement
+
+    def _pre_score(self, pred: str, true: str) -> float:
+        # A cheap local guess on the judge's 1-10 scale: the final numbers when the desired
+        # answer has one, the text similarity otherwise.
+        pred_numbers = re.findall(r"-?\d+(?:\.\d+)?", str(pred))
+        true_numbers = re.findall(r"-?\d+(?:\.\d+)?", str(true))
+        if pred_numbers and true_numbers:
+            return 10.0 if float(pred_numbers[-1]) == float(true_numbers[-1]) else 1.0
+        ratio = difflib.SequenceMatcher(None, str(pred).lower(), str(true).lower()).ratio()
+        return 1 + 9 * ratio
+
+    def _estimate(self, verdicts: list[int]) -> ScoreEstimate:
+        # Shrink the row's own verdict variance towards the pooled one, weighing the pooled
+        # variance as one observation, so that a row judged once gets the pooled variance.
+        count = len(verdicts)
+        mean = sum(verdicts) / count
+        squared_deviations = sum((verdict - mean) ** 2 for verdict in verdicts)
+        verdict_variance = (squared_deviations + self.verdict_variance()) / count
+        return ScoreEstimate(mean, verdict_variance / count, count)
+
+    @staticmethod
+    def _variance_of_mean(verdicts: list[int]) -> float:
+        if len(verdicts) < 2:
+            return 0.0
+        mean = sum(verdicts) / len(verdicts)
+        return sum((verdict - mean) ** 2 for verdict in verdicts) / (len(verdicts) - 1) / len(verdicts)
@@ -1,19 +1,56 @@
 from prompt_searcher.core.interfaces.loss import LossFunction
 from prompt_searcher.core.interfaces.agent import Agent
+from prompt_searcher.core.interfaces.generation_profile import GenerationProfile
 
 class NaiveSimilarity(LossFunction):
+    max_row_score = 10
 
-    def __init__(self, evaluator: Agent, system_message: str = None):
-        self.model = evaluator
+    def __init__(self,
+                 evaluator: Agent,
+                 system_message: str = None,
+                 max_concurrency: int = 8,
+                 profile: GenerationProfile = None):
+        self.model = evaluator if profile is None else evaluator.with_profile(profile)
         self.system_message = "You are an AI assistant tasked with evaluating the correctness of an answer compared to a desired answer. Your goal is to provide a score between 0 and 10 based on how correct the given answer is."
         if system_message is not None:
             self.system_message = system_message
+        self.max_concurrency = max_concurrency
         self.score_history = []
 
     def score(self, y_pred: list[str], y_true: list[str]) -> float:
-        total_score = 0
-        for pred, true in zip(y_pred, y_true):
-            user_message = f"""Given this answer: {pred}
+        row_scores = [
+            self._parse_score(self.model.generate_response(self.system_message, self._build_user_message(pred, true)))
+            for pred, true in zip(y_pred, y_true)
+        ]
+        average_score = self.aggregate(row_scores)
+        self.score_history.append(average_score)
+        return average_score
+
+    async def ascore(self, y_pred: list[str], y_true: list[str]) -> float:
+        requests = [
+            (self.system_message, self._build_user_message(pred, true))
+            for pred, true in zip(y_pred, y_true)
+        ]
+        responses = await self.model.generate_many(requests, max_concurrency=self.max_concurrency)
+        average_score = self.aggregate([self._parse_score(response) for response in responses])
+        self.score_history.append(average_score)
+        return average_score
+
+    async def ascore_row(self, pred: str, true: str) -> int | None:
+        response = await self.model.agenerate_response(self.system_message, self._build_user_message(pred, true))
+        return self._parse_score(response)
+
+    def aggregate(self, row_scores: list[int | None], weights: list[float] = None) -> float:
+        # Unparsable verdicts count as zero, as in the original batch scoring.
+        if weights is not None:
+            return sum(weight * score for score, weight in zip(row_scores, weights) if score is not None)
+        return sum(score for score in row_scores if score is not None) / len(row_scores)
+
+    def winner(self, previous_loss, new_loss) -> bool:
+        return True if new_loss > previous_loss else False
+
+    def _build_user_message(self, pred: str, true: str) -> str:
+        return f"""Given this answer: {pred}
                 And this desired answer: {true}
 
                 Provide a score based on the correctness of the answer compared to the desired answer.
@@ -31,16 +68,9 @@ class NaiveSimilarity(LossFunction):
                 10: Perfect answer, exactly matches the desired response
 
                 Just answer with the score number. Your score is:"""
-            response = self.model.generate_response(self.system_message, user_message)
-            try:
-                score = int(response.strip())
-                total_score += score
-            except ValueError:
-                continue
-        
-        average_score = total_score / len(y_pred)
-        self.score_history.append(average_score)
-        return average_score
 
-    def winner(self, previous_loss, new_loss) -> bool:
-        return True if new_loss > previous_loss else False
+    def _parse_score(self, response: str) -> int | None:
+        try:
+            return int(response.strip())
+        except ValueError:
+            return None
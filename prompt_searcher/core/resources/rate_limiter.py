@@ -0,0 +1,71 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from prompt_searcher.core.utils.loop_local import LoopLocal
+
+class RateLimiter:
+    """
+    Scheduler that paces requests per key (usually one key per model endpoint).
+
+    Each key can have a maximum request rate, spread evenly over time, and a maximum number
+    of requests in flight. Keys without limits are not throttled. A single RateLimiter is
+    meant to be shared by every agent and job that calls the same endpoints.
+    """
+
+    def __init__(self):
+        self._intervals = {}
+        self._next_slot = {}
+        self._max_concurrency = {}
+        # Semaphores are bound to the event loop they are first used in, so each loop gets its own.
+        self._semaphores = LoopLocal(dict)
+
+    def configure(self, key: str, requests_per_minute: float = None, max_concurrency: int = None) -> None:
+        """
+        Set the limits of a key.
+
+        Args:
+            key (str): The key to limit.
+            requests_per_minute (float, optional): Maximum request rate. Defaults to None (unlimited).
+            max_concurrency (int, optional): Maximum requests in flight. Defaults to None (unlimited).
+        """
+        if requests_per_minute:
+            self._intervals[key] = 60.0 / requests_per_minute
+        if max_concurrency:
+            self._max_concurrency[key] = max_concurrency
+            for semaphores in self._semaphores.values():
+                semaphores.pop(key, None)
+
+    @asynccontextmanager
+    async def limit(self, key: str):
+        """
+        Wait for a request slot of `key` and hold it for the duration of the block.
+
+        Args:
+            key (str): The key of the request.
+        """
+        semaphore = self._semaphore(key)
+        if semaphore is None:
+            await self._wait_for_slot(key)
+            yield
+            return
+        async with semaphore:
+            await self._wait_for_slot(key)
+            yield
+
+    def _semaphore(self, key: str) -> asyncio.Semaphore | None:
+        if key not in self._max_concurrency:
+            return None
+        semaphores = self._semaphores.get()
+        if key not in semaphores:
+            semaphores[key] = asyncio.Semaphore(self._max_concurrency[key])
+        return semaphores[key]
+
+    async def _wait_for_slot(self, key: str) -> None:
+        interval = self._intervals.get(key)
+        if interval is None:
+            return
+        now = time.monotonic()
+        slot = max(now, self._next_slot.get(key, now))
+        self._next_slot[key] = slot + interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
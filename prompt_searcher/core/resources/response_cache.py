@@ -0,0 +1,124 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+
+class ResponseCache:
+    """
+    Cache of model responses shared between agents and jobs.
+
+    Entries live in memory, and also in a SQLite file when `path` is given, so that several
+    processes can share them. Concurrent asynchronous requests for the same key are
+    computed once.
+    """
+
+    def __init__(self, path: str = None):
+        """
+        Initialize the ResponseCache class.
+
+        Args:
+            path (str, optional): SQLite file to persist entries to. Defaults to None (memory only).
+        """
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._entries = {}
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        if path is not None:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            with self._connect() as connection:
+                connection.execute("CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, response TEXT)")
+
+    @staticmethod
+    def make_key(*parts) -> str:
+        """
+        Build a cache key from JSON-serializable parts.
+
+        Returns:
+            str: A SHA-256 digest of the parts.
+        """
+        return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+
+    def get(self, key: str) -> str | None:
+        """
+        Look up a response.
+
+        Args:
+            key (str): The cache key.
+
+        Returns:
+            str | None: The cached response, or None on a miss.
+        """
+        with self._lock:
+            if key in self._entries:
+                return self._entries[key]
+        if self.path is None:
+            return None
+        with self._connect() as connection:
+            row = connection.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        with self._lock:
+            self._entries[key] = row[0]
+        return row[0]
+
+    def set(self, key: str, response: str) -> None:
+        """
+        Store a response.
+
+        Args:
+            key (str): The cache key.
+            response (str): The response to store.
+        """
+        with self._lock:
+            self._entries[key] = response
+        if self.path is not None:
+            with self._connect() as connection:
+                connection.execute("INSERT OR REPLACE INTO responses (key, response) VALUES (?, ?)", (key, response))
+
+    async def get_or_compute(self, key: str, compute) -> tuple[str, bool]:
+        """
+        Return the cached response for `key`, computing and storing it on a miss.
+
+        Concurrent calls with the same key wait for a single computation.
+
+        Args:
+            key (str): The cache key.
+            compute: A zero-argument coroutine function producing the response.
+
+        Returns:
+            tuple[str, bool]: The response, and whether it came from the cache.
+        """
+        response = self.get(key)
+        if response is not None:
+            self.hits += 1
+            return response, True
+        request = self._in_flight.get(key)
+        if request is not None:
+            self.hits += 1
+            return await asyncio.shield(request), True
+
+        self.misses += 1
+        request = asyncio.ensure_future(compute())
+        self._in_flight[key] = request
+        try:
+            response = await asyncio.shield(request)
+        finally:
+            self._in_flight.pop(key, None)
+        self.set(key, response)
+        return response, False
+
+    def get_stats(self) -> dict:
+        """
+        Report cache usage.
+
+        Returns:
+            dict: `hits`, `misses` and `entries` held in memory.
+        """
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30)
@@ -0,0 +1,179 @@
+import glob
+import os
+import uuid
+import polars as pl
+
+class ResultsStore:
+    """
+    Columnar store of per-row evaluation results.
+
+    Every evaluated row is recorded as a (run_id, epoch, candidate, row, response, score,
+    latency, tokens) record. Records are buffered column by column and flushed to Parquet
+    files partitioned by run and epoch once `flush_every` records are buffered, so memory
+    stays bounded on long runs. Queries run as lazy polars expressions over the flushed
+    files and the in-memory buffer.
+    """
+
+    SCHEMA = {
+        "run_id": pl.Utf8,
+        "epoch": pl.Int64,
+        "candidate": pl.Utf8,
+        "row": pl.Int64,
+        "response": pl.Utf8,
+        "score": pl.Float64,
+        "latency": pl.Float64,
+        "tokens": pl.Int64,
+    }
+
+    def __init__(self, path: str, flush_every: int = 10_000):
+        """
+        Initialize the ResultsStore class.
+
+        Args:
+            path (str): Directory where the Parquet partitions are written.
+            flush_every (int, optional): Number of buffered records that triggers a flush. Defaults to 10000.
+        """
+        self.path = path
+        self.flush_every = flush_every
+        self._buffer = {column: [] for column in self.SCHEMA}
+
+    def __len__(self) -> int:
+        return len(self._buffer["row"])
+
+    def record(self,
+               run_id: str,
+               epoch: int,
+               candidate: str,
+               row: int,
+               response: str,
+               score: float = None,
+               latency: float = None,
+               tokens: int = None) -> None:
+        """
+        Buffer one per-row result, flushing to disk when the buffer is full.
+
+        Args:
+            run_id (str): Identifier of the training run.
+            epoch (int): Epoch in which the row was evaluated.
+            candidate (str): The prompt being evaluated.
+            row (int): Index of the row in the dataset.
+            response (str): The student response.
+            score (float, optional): The row score, None if it could not be determined.
+            latency (float, optional): Seconds the student took to respond.
+            tokens (int, optional): Output tokens of the student response.
+        """
+        values = (run_id, epoch, candidate, row, response, score, latency, tokens)
+        for column, value in zip(self.SCHEMA, values):
+            self._buffer[column].append(value)
+        if len(self) >= self.flush_every:
+            self.flush()
+
+    def flush(self) -> None:
+        """
+        Write the buffered records to Parquet, one file per (run_id, epoch) partition.
+        """
+        if len(self) == 0:
+            return
+        frame = self._buffered_frame()
+        for (run_id, epoch), partition in frame.group_by(["run_id", "epoch"]):
+            directory = os.path.join(self.path, f"run_id={run_id}", f"epoch={epoch}")
+            os.makedirs(directory, exist_ok=True)
+            partition.write_parquet(os.path.join(directory, f"part-{uuid.uuid4().hex}.parquet"))
+        self._buffer = {column: [] for column in self.SCHEMA}
+
+    def scan(self) -> pl.LazyFrame:
+        """
+        Lazily scan every record, both flushed and still buffered.
+
+        Returns:
+            pl.LazyFrame: All records with the store schema.
+        """
+        frames = [self._buffered_frame().lazy()]
+        pattern = os.path.join(self.path, "**", "*.parquet")
+        if glob.glob(pattern, recursive=True):
+            frames.insert(0, pl.scan_parquet(pattern, hive_partitioning=False))
+        return pl.concat(frames, how="vertical")
+
+    def candidate_summary(self, run_id: str = None) -> pl.DataFrame:
+        """
+        Summarize each evaluated candidate.
+
+        Args:
+            run_id (str, optional): Restrict the summary to one run. Defaults to all runs.
+
+        Returns:
+            pl.DataFrame: One row per (run_id, candidate) with the mean score, the number of
+                rows, the number of unscored rows, the mean latency and the total tokens.
+        """
+        return (
+            self._filter_run(self.scan(), run_id)
+            .group_by(["run_id", "candidate"])
+            .agg(
+                pl.col("score").fill_null(0).mean().alias("mean_score"),
+                pl.len().alias("rows"),
+                pl.col("score").null_count().alias("unscored_rows"),
+                pl.col("latency").mean().alias("mean_latency"),
+                pl.col("tokens").sum().alias("total_tokens"),
+            )
+            .sort("mean_score", descending=True)
+            .collect()
+        )
+
+    def paired_comparison(self, prompt_a: str, prompt_b: str, run_id: str = None) -> pl.DataFrame:
+        """
+        Compare two prompts row by row on the rows both were evaluated on.
+
+        Scores of a prompt evaluated in several epochs are averaged per row first.
+
+        Args:
+            prompt_a (str): The first prompt.
+            prompt_b (str): The second prompt.
+            run_id (str, optional): Restrict the comparison to one run. Defaults to all runs.
+
+        Returns:
+            pl.DataFrame: One row per dataset row with `score_a`, `score_b` and `difference`
+                (`score_a - score_b`).
+        """
+        records = self._filter_run(self.scan(), run_id).filter(pl.col("score").is_not_null())
+
+        def per_row(prompt: str, alias: str) -> pl.LazyFrame:
+            return (
+                records.filter(pl.col("candidate") == prompt)
+                .group_by("row")
+                .agg(pl.col("score").mean().alias(alias))
+            )
+
+        return (
+            per_row(prompt_a, "score_a")
+            .join(per_row(prompt_b, "score_b"), on="row", how="inner")
+            .with_columns((pl.col("score_a") - pl.col("score_b")).alias("difference"))
+            .sort("row")
+            .collect()
+        )
+
+    def paired_summary(self, prompt_a: str, prompt_b: str, run_id: str = None) -> dict:
+        """
+        Summarize `paired_comparison` into wins, losses, ties and the mean difference.
+
+        Args:
+            prompt_a (str): The first prompt.
+            prompt_b (str): The second prompt.
+            run_id (str, optional): Restrict the comparison to one run. Defaults to all runs.
+
+        Returns:
+            dict: `rows`, `wins_a`, `wins_b`, `ties`, `mean_difference` and `std_difference`.
+        """
+        return self.paired_comparison(prompt_a, prompt_b, run_id).select(
+            pl.len().alias("rows"),
+            (pl.col("difference") > 0).sum().alias("wins_a"),
+            (pl.col("difference") < 0).sum().alias("wins_b"),
+            (pl.col("difference") == 0).sum().alias("ties"),
+            pl.col("difference").mean().alias("mean_difference"),
+            pl.col("difference").std().alias("std_difference"),
+        ).row(0, named=True)
+
+    def _buffered_frame(self) -> pl.DataFrame:
+        return pl.DataFrame(self._buffer, schema=self.SCHEMA)
+
+    def _filter_run(self, frame: pl.LazyFrame, run_id: str = None) -> pl.LazyFrame:
+        return frame if run_id is None else frame.filter(pl.col("run_id") == run_id)
@@ -0,0 +1,43 @@
+import asyncio
+
+class LoopLocal:
+    """
+    A value created lazily once per running event loop.
+
+    Async clients, semaphores and other asyncio objects are bound to the loop they are first
+    used in, while the synchronous entry points (`PromptSearch.train`, `ExperimentRunner.run`,
+    ...) run every call on a new loop. Objects kept in a LoopLocal are created again in each
+    loop, and dropped once their loop is closed.
+    """
+
+    def __init__(self, factory):
+        """
+        Initialize the LoopLocal class.
+
+        Args:
+            factory: Callable without arguments that creates the value for a new loop.
+        """
+        self.factory = factory
+        self._values = {}
+
+    def get(self):
+        """
+        The value of the running loop, created on first use.
+
+        Returns:
+            The value of the running loop.
+        """
+        loop = asyncio.get_running_loop()
+        if loop not in self._values:
+            self._values = {key: value for key, value in self._values.items() if not key.is_closed()}
+            self._values[loop] = self.factory()
+        return self._values[loop]
+
+    def values(self) -> list:
+        """
+        The values of the loops that are still open.
+
+        Returns:
+            list: One value per open loop that has used this LoopLocal.
+        """
+        return [value for loop, value in self._values.items() if not loop.is_closed()]
@@ -0,0 +1,24 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+def run_sync(coroutine):
+    """
+    Run a coroutine to completion from synchronous code.
+
+    Outside an event loop the coroutine runs with `asyncio.run`. Inside a running loop, such as
+    a Jupyter notebook or an async web server, `asyncio.run` is not allowed, so the coroutine runs
+    on a worker thread with its own loop and the caller blocks until it finishes. Async callers
+    should await the coroutine directly instead.
+
+    Args:
+        coroutine: The coroutine to run.
+
+    Returns:
+        The result of the coroutine.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coroutine)
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, coroutine).result()
@@ -1,13 +1,21 @@
+from functools import cmp_to_key
 from typing import List, Tuple
+import asyncio
+import time
 import traceback
+import uuid
 from prompt_searcher.core import (
     load_dataset,
     load_unsupervised_dataset,
     Backpropagation,
     ObjectivePrompt,
     LossFunction,
-    Agent
+    Agent,
+    GenerationProfile,
+    ResultsStore
 )
+from prompt_searcher.core.utils.run_sync import run_sync
+from prompt_searcher.training.row_sampler import RowSampler
 import matplotlib.pyplot as plt
 
 class PromptSearch:
@@ -20,6 +28,16 @@ class PromptSearch:
         objective_prompt: ObjectivePrompt,  # Initial objective prompt
         epochs: int = 5,  # Number of training epochs
         verbose: bool = True,
+        max_concurrency: int = 8,  # Maximum number of student requests in flight
+        judge_concurrency: int = 8,  # Maximum number of row judgments in flight
+        pipeline: bool = True,  # Stream student responses straight into the judge
+        speculative_optimization: bool = True,  # Overlap the next optimization with the evaluation tail
+        speculation_threshold: float = 0.8,  # Fraction of judged rows before speculating
+        results_store: ResultsStore = None,  # Store for per-row results
+        run_id: str = None,  # Identifier of this run in the results store
+        row_sampler: RowSampler = None,  # Adaptive per-row sampling of the dataset
+        confirm_winners: bool = True,  # Re-check sampled winners on the full set
+        student_profile: GenerationProfile = None,  # Generation settings of the student
     ):
         """
         Initialize the PromptSearch class.
@@ -34,12 +52,37 @@ class PromptSearch:
             objective_prompt (ObjectivePrompt): Initial objective prompt.
             epochs (int, optional): Number of training epochs. Defaults to 5.
             verbose (bool, optional): Whether to print progress information. Defaults to True.
+            max_concurrency (int, optional): Maximum number of concurrent student requests. Defaults to 8.
+            judge_concurrency (int, optional): Maximum number of concurrent row judgments. Defaults to 8.
+            pipeline (bool, optional): Judge each student response as soon as it completes, when the
+                loss function supports row scoring. Defaults to True.
+            speculative_optimization (bool, optional): Start optimizing the next prompt before the
+                evaluation finishes when the partial score already loses to the best one. Defaults to True.
+            speculation_threshold (float, optional): Fraction of rows that must be judged before
+                speculating. Defaults to 0.8.
+            results_store (ResultsStore, optional): Store that receives every evaluated row. Defaults to None.
+            run_id (str, optional): Identifier of this run in the results store. Defaults to a random id.
+            row_sampler (RowSampler, optional): Sampler that picks the rows evaluated in each epoch when
+                the loss function supports row scoring. Defaults to None (every row, every epoch).
+            confirm_winners (bool, optional): When a sampled epoch beats the best score, evaluate the
+                remaining rows before accepting it. Defaults to True.
+            student_profile (GenerationProfile, optional): Generation profile applied to the student.
+                Defaults to None (the student's own profile).
         """
         try:
-            self.student = student
+            self.student = student if student_profile is None else student.with_profile(student_profile)
             self.epochs = epochs
             self.dataset_path = dataset_path
             self.verbose = verbose
+            self.max_concurrency = max_concurrency
+            self.judge_concurrency = judge_concurrency
+            self.pipeline = pipeline
+            self.speculative_optimization = speculative_optimization
+            self.speculation_threshold = speculation_threshold
+            self.results_store = results_store
+            self.run_id = run_id if run_id is not None else uuid.uuid4().hex[:8]
+            self.row_sampler = row_sampler
+            self.confirm_winners = confirm_winners
 
             self.dataset = load_dataset(self.dataset_path)
                 
@@ -72,28 +115,38 @@ class PromptSearch:
 
         Prints progress information for each epoch, including the current score,
         current prompt, and improved prompt.
+
+        Inside a running event loop (a Jupyter notebook, for example) training runs on a worker
+        thread; async callers should `await atrain()` instead.
+        """
+        run_sync(self.atrain())
+
+    async def atrain(self):
+        """
+        Asynchronous counterpart of `train`.
+
+        When the loss function supports row scoring, each epoch is pipelined: every student
+        response is queued for judging as soon as it completes, so the evaluator works while
+        the student is still generating. If the partial score already loses to the best score,
+        the optimization of the next prompt is started speculatively and overlaps with the
+        tail of the evaluation; it is discarded if the candidate ends up winning.
         """
         try:
             for i in range(self.epochs):
                 if self.verbose:
                     print("*"*100)
                     print(f"Epoch {i+1}/{self.epochs}")
-                y_pred = []
                 current_prompt = self.objective_prompt.get_last_prompt()
                 
                 if self.verbose:
                     print(f"****\nTesting prompt: {current_prompt}\n****")
-                for input_prompt, _ in self.dataset:
-                    try:
-                        response = self.student.generate_response(current_prompt, input_prompt)
-                        y_pred.append(response)
-                    except Exception as e:
-                        if self.verbose:
-                            print(f"Error generating response: {str(e)}")
-                            print(traceback.format_exc())
-                
+
+                speculative_task = None
                 try:
-                    current_score = self.score_function.score(y_pred, self.y_train)
+                    if self.pipeline and self.score_function.supports_row_scoring():
+                        current_score, rows, speculative_task = await self._evaluate_rows(current_prompt, i + 1)
+                    else:
+                        current_score, rows = await self._evaluate(current_prompt, i + 1)
                     if self.verbose:
                         print(f"Score: {current_score}")
                     
@@ -116,10 +169,21 @@ class PromptSearch:
                 elif self.verbose:
                     print(f"- No improvement with this prompt.")
 
+                if self.verbose:
+                    for stats in self.get_hedge_stats():
+                        print(f"Hedged {stats['hedges']}/{stats['requests']} {stats['role']} requests "
+                              f"({stats['hedge_wins']} answered first)")
+
                 try:
-                    improved_prompt = self.backpropagation.optimize_prompt(
-                        self.best_prompt, self.best_score, previous_prompt=previous_prompt 
-                    )
+                    if speculative_task is not None and previous_prompt is not None:
+                        # The speculation assumed exactly this outcome, so its result is valid.
+                        improved_prompt = await speculative_task
+                    else:
+                        self._discard_task(speculative_task)
+                        improved_prompt = await self.backpropagation.aoptimize_prompt(
+                            self.best_prompt, self.best_score, previous_prompt=previous_prompt,
+                            failures=self._failures(list(rows.values()))
+                        )
                     self.objective_prompt.update(improved_prompt)
                 except Exception as e:
                     if self.verbose:
@@ -129,6 +193,222 @@ class PromptSearch:
             if self.verbose:
                 print(f"Error during training: {str(e)}")
                 print(traceback.format_exc())
+        finally:
+            if self.results_store is not None:
+                self.results_store.flush()
+
+    async def _evaluate(self, current_prompt: str, epoch: int) -> Tuple[float, dict]:
+        """
+        Evaluate a prompt with a barrier between generation and scoring.
+
+        Used for loss functions that can only score the full set of predictions at once.
+
+        Args:
+            current_prompt (str): The prompt to evaluate.
+            epoch (int): The current epoch, used when recording results.
+
+        Returns:
+            Tuple[float, dict]: The score of the prompt, and no rows, since row scores are not
+                available when the loss function scores the whole set at once.
+        """
+        responses = await self.student.generate_many(
+            [(current_prompt, input_prompt) for input_prompt in self.x_train],
+            max_concurrency=self.max_concurrency,
+            return_exceptions=True
+        )
+        y_pred = []
+        y_true = []
+        for index, (response, expected) in enumerate(zip(responses, self.y_train)):
+            if isinstance(response, Exception):
+                self._report_generation_error(response)
+                continue
+            self._record(epoch, current_prompt, index, response)
+            y_pred.append(response)
+            y_true.append(expected)
+        return await self.score_function.ascore(y_pred, y_true), {}
+
+    async def _evaluate_rows(self, current_prompt: str, epoch: int) -> Tuple[float, dict, asyncio.Task]:
+        """
+        Evaluate a prompt row by row, on the rows chosen by the row sampler.
+
+        Args:
+            current_prompt (str): The prompt to evaluate.
+            epoch (int): The current epoch.
+
+        Returns:
+            Tuple[float, dict, asyncio.Task]: The score of the prompt, its scored
+                (input, expected, actual, score) rows keyed by row index, and the speculative
+                optimization task if one was started (None otherwise).
+        """
+        indices = list(range(len(self.dataset)))
+        probabilities = None
+        if self.row_sampler is not None:
+            indices, probabilities = self.row_sampler.plan(epoch, len(self.dataset))
+            if probabilities is not None and self.verbose:
+                print(f"Evaluating {len(indices)}/{len(self.dataset)} sampled rows")
+
+        rows, speculative_task = await self._evaluate_pipelined(current_prompt, epoch, indices, probabilities)
+        current_score = self._aggregate_rows(rows, probabilities)
+
+        if probabilities is not None and self.confirm_winners and self.score_function.winner(self.best_score, current_score):
+            if self.verbose:
+                print(f"Sampled score {current_score} beats the best score, checking the remaining rows")
+            sampled = set(indices)
+            remaining = [index for index in range(len(self.dataset)) if index not in sampled]
+            remaining_rows, _ = await self._evaluate_pipelined(current_prompt, epoch, remaining, speculate=False)
+            rows.update(remaining_rows)
+            current_score = self._aggregate_rows(rows)
+
+        if self.row_sampler is not None:
+            self.row_sampler.update({index: row[3] for index, row in rows.items()}, current_score)
+        return current_score, rows, speculative_task
+
+    async def _evaluate_pipelined(self,
+                                  current_prompt: str,
+                                  epoch: int,
+                                  indices: List[int],
+                                  probabilities: dict = None,
+                                  speculate: bool = True) -> Tuple[dict, asyncio.Task]:
+        """
+        Evaluate a prompt on some rows, judging each student response as soon as it completes.
+
+        Args:
+            current_prompt (str): The prompt to evaluate.
+            epoch (int): The current epoch, used when recording results.
+            indices (List[int]): The indices of the rows to evaluate.
+            probabilities (dict, optional): Inclusion probabilities of sampled rows, keyed by row
+                index. Defaults to None (a full-set evaluation).
+            speculate (bool, optional): Allow a speculative optimization. Defaults to True.
+
+        Returns:
+            Tuple[dict, asyncio.Task]: The scored (input, expected, actual, score) rows keyed by
+                row index, and the speculative optimization task if one was started (None otherwise).
+        """
+        queue = asyncio.Queue()
+        student_semaphore = asyncio.Semaphore(self.max_concurrency)
+        rows = {}
+        speculative_task = None
+
+        async def generate(index: int, input_prompt: str, expected: str):
+            async with student_semaphore:
+                start = time.perf_counter()
+                try:
+                    response, tokens = await self.student.agenerate_response_with_usage(current_prompt, input_prompt)
+                except Exception as e:
+                    self._report_generation_error(e)
+                    return
+                latency = time.perf_counter() - start
+            await queue.put((index, input_prompt, response, expected, latency, tokens))
+
+        async def judge():
+            nonlocal speculative_task
+            while True:
+                item = await queue.get()
+                if item is None:
+                    return
+                index, input_prompt, response, expected, latency, tokens = item
+                row_score = await self.score_function.ascore_row(response, expected)
+                rows[index] = (input_prompt, expected, response, row_score)
+                self._record(epoch, current_prompt, index, response, row_score, latency, tokens)
+                if speculate and speculative_task is None and self._should_speculate(rows, len(indices), probabilities):
+                    partial_rows = list(rows.values())
+                    speculative_task = asyncio.create_task(self.backpropagation.aoptimize_prompt(
+                        self.best_prompt, self.best_score, previous_prompt=current_prompt,
+                        failures=self._failures(partial_rows)
+                    ))
+
+        judges = [asyncio.create_task(judge()) for _ in range(self.judge_concurrency)]
+        try:
+            await asyncio.gather(*(
+                generate(index, *self.dataset[index])
+                for index in indices
+            ))
+            for _ in judges:
+                await queue.put(None)
+            await asyncio.gather(*judges)
+        except BaseException:
+            for task in judges:
+                task.cancel()
+            self._discard_task(speculative_task)
+            raise
+        return rows, speculative_task
+
+    def _should_speculate(self, rows: dict, total: int, probabilities: dict = None) -> bool:
+        """
+        Whether enough rows have been judged, and badly enough, to start the next optimization early.
+
+        Args:
+            rows (dict): The (input, expected, actual, score) rows judged so far, keyed by row index.
+            total (int): The number of rows being evaluated.
+            probabilities (dict, optional): Inclusion probabilities of sampled rows. Defaults to None.
+
+        Returns:
+            bool: True if the partial score already loses to the best score.
+        """
+        if not self.speculative_optimization or len(rows) < self.speculation_threshold * total:
+            return False
+        return not self.score_function.winner(self.best_score, self._aggregate_rows(rows, probabilities))
+
+    def _aggregate_rows(self, rows: dict, probabilities: dict = None) -> float:
+        # Rows missing from `rows` (failed generations, or rows not judged yet) are left out in
+        # both cases: the full-set score averages the rows present, and the sampled estimate
+        # normalizes its weights over them.
+        indices = sorted(rows)
+        if probabilities is None:
+            return self.score_function.aggregate([rows[index][3] for index in indices])
+        scores, weights = self.row_sampler.estimate_terms(
+            {index: rows[index][3] for index in indices}, probabilities, len(self.dataset)
+        )
+        return self.score_function.aggregate(scores, weights=weights)
+
+    def _failures(self, rows: List[tuple]) -> List[tuple]:
+        """
+        Select the rows where the last tested prompt fell short, worst first.
+
+        A row fell short when it scored below the loss function's `max_row_score`. Loss
+        functions without a known best row score fall back to the rows below the best row, or
+        every row when they all scored the same, so a prompt that fails every row equally still
+        gets its failures shown. Rows without a score (an unparsable verdict) count as the worst
+        score when aggregated, so they always fell short and come first.
+
+        Args:
+            rows (List[tuple]): The (input, expected, actual, score) rows of the last tested prompt.
+
+        Returns:
+            List[tuple]: The failed rows, ordered from worst to best score.
+        """
+        winner = self.score_function.winner
+        # winner(previous, new) is the only ordering a loss function defines; rows beaten by others go first.
+        unscored = [row for row in rows if row[3] is None]
+        scored = sorted(
+            (row for row in rows if row[3] is not None),
+            key=cmp_to_key(lambda a, b: -1 if winner(a[3], b[3]) else 1 if winner(b[3], a[3]) else 0)
+        )
+        if not scored:
+            return unscored
+        target = self.score_function.max_row_score
+        if target is None:
+            target = scored[-1][3]
+            if not winner(scored[0][3], target):
+                return unscored + scored
+        return unscored + [row for row in scored if winner(row[3], target)]
+
+    def _discard_task(self, task: asyncio.Task):
+        if task is None:
+            return
+        task.cancel()
+        # Retrieve the outcome so a failed speculation is not reported as an unhandled error.
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+
+    def _record(self, epoch: int, candidate: str, row: int, response: str,
+                score: float = None, latency: float = None, tokens: int = None):
+        if self.results_store is not None:
+            self.results_store.record(self.run_id, epoch, candidate, row, response, score, latency, tokens)
+
+    def _report_generation_error(self, error: Exception):
+        if self.verbose:
+            print(f"Error generating response: {str(error)}")
+            print("".join(traceback.format_exception(error)))
 
     def get_best_prompt(self) -> str:
         return self.best_prompt
@@ -139,6 +419,22 @@ class PromptSearch:
     def get_results(self) -> Tuple[str, float]:
         return self.best_prompt, self.best_score
 
+    def get_hedge_stats(self) -> List[dict]:
+        """
+        Collects the hedging statistics of the student, evaluator and augmentator.
+
+        Returns:
+            List[dict]: The `get_hedge_stats()` of every agent that hedges its requests.
+        """
+        agents = [self.student, getattr(self.score_function, "model", None), self.backpropagation.model]
+        seen = []
+        stats = []
+        for agent in agents:
+            if hasattr(agent, "get_hedge_stats") and not any(agent is other for other in seen):
+                seen.append(agent)
+                stats.append(agent.get_hedge_stats())
+        return stats
+
     def plot_score_history(self, figsize: Tuple[int, int] = (10, 6)):
         """
         Plots the score history.
@@ -0,0 +1,215 @@
+from typing import Dict, List, Optional, Tuple
+import math
+import random
+
+class RowSampler:
+    def __init__(
+        self,
+        sample_fraction: float = 0.5,  # Expected fraction of rows evaluated in sampled epochs
+        warmup_epochs: int = 2,  # Epochs evaluated on the full set before sampling starts
+        full_eval_every: int = 4,  # Every n-th epoch is evaluated on the full set
+        min_probability: float = 0.05,  # Lower bound of every row's inclusion probability
+        seed: int = None,
+    ):
+        """
+        Adaptive per-row sampler for PromptSearch.
+
+        The sampler keeps statistics for every row across the evaluated candidates: the mean
+        and variance of the row score, and the correlation between the row score and the
+        candidate's overall score (its agreement with the ranking). After the warm-up, epochs
+        evaluate a Poisson sample of rows, where discriminative rows (high variance, high
+        agreement) are more likely to be picked, and saturated rows are rarely picked. Every row
+        keeps a non-zero inclusion probability. The sampled score is a difference estimator: the
+        mean of every row's historical mean, corrected by the inverse-probability weighted mean
+        of the sampled rows' residuals (see `estimate_terms`). Periodic full-set epochs keep the
+        statistics fresh.
+
+        Args:
+            sample_fraction (float, optional): Expected fraction of rows per sampled epoch. Defaults to 0.5.
+            warmup_epochs (int, optional): Full-set epochs before sampling starts. Defaults to 2.
+            full_eval_every (int, optional): Evaluate every n-th epoch on the full set; 0 disables
+                periodic checks. Defaults to 4.
+            min_probability (float, optional): Minimum inclusion probability of any row. Defaults to 0.05.
+            seed (int, optional): Seed of the random generator. Defaults to None.
+        """
+        self.sample_fraction = sample_fraction
+        self.warmup_epochs = warmup_epochs
+        self.full_eval_every = full_eval_every
+        self.min_probability = min_probability
+        self.random = random.Random(seed)
+        self.row_stats = {}
+
+    def plan(self, epoch: int, num_rows: int) -> Tuple[List[int], Optional[Dict[int, float]]]:
+        """
+        Choose the rows to evaluate in an epoch.
+
+        Args:
+            epoch (int): The epoch, starting at 1.
+            num_rows (int): The number of rows in the dataset.
+
+        Returns:
+            Tuple[List[int], Optional[Dict[int, float]]]: The row indices, and their inclusion
+                probabilities keyed by row index, or None for a full-set epoch.
+        """
+        if self.is_full_epoch(epoch):
+            return list(range(num_rows)), None
+        probabilities = self.inclusion_probabilities(num_rows)
+        indices = [index for index, probability in enumerate(probabilities) if self.random.random() < probability]
+        if not indices:
+            return list(range(num_rows)), None
+        return indices, {index: probabilities[index] for index in indices}
+
+    def estimate_terms(self,
+                       row_scores: Dict[int, float],
+                       probabilities: Dict[int, float],
+                       num_rows: int) -> Tuple[List[float], List[float]]:
+        """
+        Express the sampled score as row scores and weights for `LossFunction.aggregate`.
+
+        The estimate is `mean(m) + sum(w_i * (y_i - m_i))` over the sampled rows, where `m_i` is
+        the historical mean of row i and `w_i` are the inverse inclusion probabilities normalized
+        over the sampled rows that were scored. Rows that score like they usually do contribute
+        no sampling noise, and a uniform shift of every row is estimated exactly, unlike a plain
+        Horvitz-Thompson sum. Rows missing from `row_scores`, such as failed generations, are left
+        out, as in a full-set evaluation.
+
+        Args:
+            row_scores (Dict[int, float]): The scores of the sampled rows, keyed by row index.
+            probabilities (Dict[int, float]): The inclusion probabilities of the sampled rows.
+            num_rows (int): The number of rows in the dataset.
+
+        Returns:
+            Tuple[List[float], List[float]]: Row scores and weights (some negative) whose weighted
+                sum is the estimate.
+        """
+        means = self.row_means(num_rows)
+        total = sum(1 / probabilities[index] for index in row_scores)
+        scores = []
+        weights = []
+        for index, score in row_scores.items():
+            weight = 1 / (probabilities[index] * total)
+            scores += [score, means[index]]
+            weights += [weight, -weight]
+        scores += means
+        weights += [1 / num_rows] * num_rows
+        return scores, weights
+
+    def row_means(self, num_rows: int) -> List[float]:
+        """
+        The historical mean score of every row; rows never scored get the mean of the others.
+
+        Args:
+            num_rows (int): The number of rows in the dataset.
+
+        Returns:
+            List[float]: One mean per row (0.0 for every row when none has been scored).
+        """
+        means = [self.row_summary(index)["mean"] for index in range(num_rows)]
+        known = [mean for mean in means if mean is not None]
+        fallback = sum(known) / len(known) if known else 0.0
+        return [fallback if mean is None else mean for mean in means]
+
+    def is_full_epoch(self, epoch: int) -> bool:
+        if epoch <= self.warmup_epochs:
+            return True
+        return bool(self.full_eval_every) and epoch % self.full_eval_every == 0
+
+    def update(self, row_scores: Dict[int, float], candidate_score: float) -> None:
+        """
+        Record the row scores of an evaluated candidate.
+
+        Args:
+            row_scores (Dict[int, float]): Row scores keyed by row index; None scores are skipped.
+            candidate_score (float): The overall score of the candidate.
+        """
+        for index, score in row_scores.items():
+            if score is None:
+                continue
+            stats = self.row_stats.setdefault(index, {"n": 0, "x": 0.0, "y": 0.0, "xx": 0.0, "yy": 0.0, "xy": 0.0})
+            stats["n"] += 1
+            stats["x"] += candidate_score
+            stats["y"] += score
+            stats["xx"] += candidate_score * candidate_score
+            stats["yy"] += score * score
+            stats["xy"] += candidate_score * score
+
+    def row_summary(self, index: int) -> dict:
+        """
+        Statistics of one row.
+
+        Args:
+            index (int): The row index.
+
+        Returns:
+            dict: `observations`, `mean`, `variance` and `agreement` (correlation between the row
+                score and the candidate score, 0 when undefined).
+        """
+        stats = self.row_stats.get(index)
+        if stats is None or stats["n"] == 0:
+            return {"observations": 0, "mean": None, "variance": None, "agreement": 0.0}
+        n = stats["n"]
+        mean = stats["y"] / n
+        variance = max(stats["yy"] / n - mean * mean, 0.0)
+        candidate_variance = max(stats["xx"] / n - (stats["x"] / n) ** 2, 0.0)
+        covariance = stats["xy"] / n - (stats["x"] / n) * mean
+        agreement = 0.0
+        if variance > 0 and candidate_variance > 0:
+            agreement = covariance / math.sqrt(variance * candidate_variance)
+        return {"observations": n, "mean": mean, "variance": variance, "agreement": agreement}
+
+    def discrimination(self, num_rows: int) -> List[float]:
+        """
+        How useful each row is for telling candidates apart.
+
+        Rows seen fewer than twice get the highest weight, so they are explored first.
+
+        Args:
+            num_rows (int): The number of rows in the dataset.
+
+        Returns:
+            List[float]: One non-negative weight per row.
+        """
+        weights = []
+        for index in range(num_rows):
+            summary = self.row_summary(index)
+            if summary["observations"] < 2:
+                weights.append(None)
+                continue
+            weights.append(math.sqrt(summary["variance"]) * (1 + max(summary["agreement"], 0.0)))
+        known = [weight for weight in weights if weight is not None]
+        explore = max(known) if known and max(known) > 0 else 1.0
+        return [explore if weight is None else weight for weight in weights]
+
+    def inclusion_probabilities(self, num_rows: int) -> List[float]:
+        """
+        Inclusion probabilities proportional to row discrimination.
+
+        The probabilities sum to about `sample_fraction * num_rows`, are capped at 1 and are at
+        least `min_probability`.
+
+        Args:
+            num_rows (int): The number of rows in the dataset.
+
+        Returns:
+            List[float]: One probability per row.
+        """
+        weights = self.discrimination(num_rows)
+        target = max(1.0, self.sample_fraction * num_rows)
+        capped = set()
+        scale = 0.0
+        while True:
+            free_weight = sum(weight for index, weight in enumerate(weights) if index not in capped)
+            if free_weight <= 0:
+                break
+            scale = (target - len(capped)) / free_weight
+            newly_capped = {
+                index for index, weight in enumerate(weights)
+                if index not in capped and weight * scale >= 1
+            }
+            if not newly_capped:
+                break
+            capped |= newly_capped
+        return [
+            1.0 if index in capped else min(1.0, max(self.min_probability, weight * scale))
+            for index, weight in enumerate(weights)
+        ]
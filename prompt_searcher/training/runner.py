@@ -0,0 +1,438 @@
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+from typing import List
+import asyncio
+import copy
+import json
+import math
+import multiprocessing
+import os
+import traceback
+from prompt_searcher.core import (
+    Agent,
+    AnthropicAgent,
+    Backpropagation,
+    CachedAgent,
+    GenerationProfile,
+    GroqAgent,
+    HedgedAgent,
+    LocalAgent,
+    LossFunction,
+    NaiveSimilarity,
+    AdaptiveSimilarity,
+    ObjectivePrompt,
+    OpenAIAgent,
+    PromptSearch,
+    RateLimitedAgent,
+    RateLimiter,
+    ResponseCache,
+    ResultsStore,
+    RowSampler,
+)
+from prompt_searcher.core.learning.progressive_backpropagation import ProgressiveBackpropagation
+from prompt_searcher.core.utils.run_sync import run_sync
+import polars as pl
+
+PROVIDERS = {
+    "openai": OpenAIAgent,
+    "anthropic": AnthropicAgent,
+    "groq": GroqAgent,
+    "local": LocalAgent,
+}
+
+API_KEY_ENVS = {
+    "openai": "OPENAI_API_KEY",
+    "anthropic": "ANTHROPIC_API_KEY",
+    "groq": "GROQ_API_KEY",
+}
+
+LOSS_FUNCTIONS = {
+    "naive_similarity": NaiveSimilarity,
+    "adaptive_similarity": AdaptiveSimilarity,
+}
+
+BACKPROPAGATIONS = {
+    "backpropagation": Backpropagation,
+    "progressive": ProgressiveBackpropagation,
+}
+
+class Experiment:
+    def __init__(
+        self,
+        name: str,  # Unique name, also used as the run id in the results store
+        dataset_path: str,  # Path to the dataset file
+        objective_prompt: ObjectivePrompt,  # Initial objective prompt
+        student: Agent,  # Agent used as the student model
+        loss_function: LossFunction,  # Function to calculate loss/score
+        backpropagation: Backpropagation,  # Backpropagation algorithm
+        epochs: int = 5,  # Number of training epochs
+        **search_kwargs,  # Extra PromptSearch arguments
+    ):
+        """
+        A single prompt search job for the ExperimentRunner.
+
+        Args:
+            name (str): Unique name of the experiment, also used as its run id.
+            dataset_path (str): Path to the dataset file.
+            objective_prompt (ObjectivePrompt): Initial objective prompt.
+            student (Agent): Agent used as the student model.
+            loss_function (LossFunction): Function to calculate loss/score.
+            backpropagation (Backpropagation): Backpropagation algorithm.
+            epochs (int, optional): Number of training epochs. Defaults to 5.
+            **search_kwargs: Extra keyword arguments passed to PromptSearch.
+        """
+        self.name = name
+        self.dataset_path = dataset_path
+        self.objective_prompt = objective_prompt
+        self.student = student
+        self.loss_function = loss_function
+        self.backpropagation = backpropagation
+        self.epochs = epochs
+        self.search_kwargs = search_kwargs
+
+class ExperimentRunner:
+    def __init__(
+        self,
+        experiments: List[Experiment] = None,
+        max_parallel_jobs: int = 4,
+        cache: ResponseCache = None,
+        rate_limiter: RateLimiter = None,
+        results_store: ResultsStore = None,
+        verbose: bool = False,
+    ):
+        """
+        Run many prompt search experiments concurrently on one event loop.
+
+        Every agent used by the experiments is shared: each agent object is wrapped once so
+        that all jobs go through the same response cache and rate limiter, and reuse the
+        agent's client and its connection pool.
+
+        Args:
+            experiments (List[Experiment], optional): The experiments to run. Defaults to None.
+            max_parallel_jobs (int, optional): Maximum number of experiments running at once. Defaults to 4.
+            cache (ResponseCache, optional): Shared response cache. Defaults to a new in-memory cache.
+            rate_limiter (RateLimiter, optional): Shared rate limiter. Defaults to an unconfigured one.
+            results_store (ResultsStore, optional): Store for per-row results of every experiment. Defaults to None.
+            verbose (bool, optional): Whether the experiments print progress information. Defaults to False.
+        """
+        self.experiments = list(experiments or [])
+        self.max_parallel_jobs = max_parallel_jobs
+        self.cache = cache if cache is not None else ResponseCache()
+        self.rate_limiter = rate_limiter if rate_limiter is not None else RateLimiter()
+        self.results_store = results_store
+        self.verbose = verbose
+        self.leaderboard = None
+        self._shared = {}
+
+    def add(self, experiment: Experiment) -> None:
+        self.experiments.append(experiment)
+
+    def share(self, agent: Agent, wrap: bool = True) -> Agent:
+        """
+        Return the shared version of an agent, wrapping each agent object only once.
+
+        Agents already built on the runner's cache or rate limiter, such as `with_profile`
+        copies of shared agents, are registered as they are instead of being wrapped again.
+
+        Args:
+            agent (Agent): The agent to share.
+            wrap (bool, optional): Wrap the agent with the runner's rate limiter and cache. Pass False
+                for agents already built on the runner's resources. Defaults to True.
+
+        Returns:
+            Agent: The agent to hand to the experiments.
+        """
+        if id(agent) in self._shared:
+            return self._shared[id(agent)]
+        if wrap and not self._uses_shared_resources(agent):
+            shared = CachedAgent(RateLimitedAgent(agent, self.rate_limiter), self.cache)
+        else:
+            shared = agent
+        self._shared[id(agent)] = shared
+        self._shared[id(shared)] = shared
+        return shared
+
+    def _uses_shared_resources(self, agent: Agent) -> bool:
+        while isinstance(agent, Agent):
+            if getattr(agent, "cache", None) is self.cache or getattr(agent, "rate_limiter", None) is self.rate_limiter:
+                return True
+            agent = getattr(agent, "agent", None)
+        return False
+
+    def run(self) -> pl.DataFrame:
+        """
+        Run every experiment and return the leaderboard.
+
+        Returns:
+            pl.DataFrame: One row per experiment, best score first.
+        """
+        return run_sync(self.arun())
+
+    async def arun(self) -> pl.DataFrame:
+        """
+        Asynchronous counterpart of `run`.
+
+        Returns:
+            pl.DataFrame: One row per experiment, best score first.
+        """
+        semaphore = asyncio.Semaphore(self.max_parallel_jobs)
+        rows = await asyncio.gather(*(self._run_experiment(experiment, semaphore) for experiment in self.experiments))
+        if self.results_store is not None:
+            self.results_store.flush()
+        self.leaderboard = make_leaderboard(rows)
+        return self.leaderboard
+
+    async def _run_experiment(self, experiment: Experiment, semaphore: asyncio.Semaphore) -> dict:
+        row = {
+            "experiment": experiment.name,
+            "dataset": experiment.dataset_path,
+            "student": experiment.student.model,
+            "initial_prompt": experiment.objective_prompt.get_last_prompt(),
+            "best_score": None,
+            "best_prompt": None,
+            "epochs": 0,
+            "error": None,
+        }
+        async with semaphore:
+            try:
+                # Copies, so that the caller's objects keep their own agents, history and prompt.
+                loss_function = copy.copy(experiment.loss_function)
+                loss_function.model = self.share(loss_function.model)
+                if hasattr(loss_function, "score_history"):
+                    loss_function.score_history = []
+                backpropagation = copy.copy(experiment.backpropagation)
+                backpropagation.model = self.share(backpropagation.model)
+                search = PromptSearch(
+                    dataset_path=experiment.dataset_path,
+                    student=self.share(experiment.student),
+                    loss_function=loss_function,
+                    backpropagation=backpropagation,
+                    objective_prompt=ObjectivePrompt(row["initial_prompt"]),
+                    epochs=experiment.epochs,
+                    verbose=self.verbose,
+                    results_store=self.results_store,
+                    run_id=experiment.name,
+                    **experiment.search_kwargs
+                )
+                await search.atrain()
+                row["best_prompt"], row["best_score"] = search.get_results()
+                row["epochs"] = len(search.score_history)
+            except Exception as e:
+                row["error"] = str(e)
+                if self.verbose:
+                    print(f"Error running experiment {experiment.name}: {str(e)}")
+                    print(traceback.format_exc())
+        return row
+
+def make_leaderboard(rows: List[dict]) -> pl.DataFrame:
+    """
+    Build a leaderboard from experiment result rows, best score first.
+
+    Args:
+        rows (List[dict]): One result row per experiment.
+
+    Returns:
+        pl.DataFrame: The leaderboard.
+    """
+    schema = {
+        "experiment": pl.Utf8,
+        "dataset": pl.Utf8,
+        "student": pl.Utf8,
+        "initial_prompt": pl.Utf8,
+        "best_score": pl.Float64,
+        "best_prompt": pl.Utf8,
+        "epochs": pl.Int64,
+        "error": pl.Utf8,
+    }
+    rows = [{**row, "best_prompt": None if row["best_prompt"] is None else str(row["best_prompt"])} for row in rows]
+    return pl.DataFrame(rows, schema=schema).sort("best_score", descending=True, nulls_last=True)
+
+def load_config(path: str) -> dict:
+    """
+    Load an experiments config from a JSON file.
+
+    Args:
+        path (str): The path to the JSON file.
+
+    Returns:
+        dict: The config.
+
+    The config has the following format:
+    {
+        "max_parallel_jobs": 4,
+        "output_dir": "runs",                       (optional: results store and leaderboard.csv)
+        "cache_path": "runs/cache.sqlite",          (optional: cache shared across processes)
+        "agents": {
+            "gemma": {"provider": "groq", "model": "gemma2-9b-it", "requests_per_minute": 30},
+            "gpt4o": {"provider": "openai", "model": "gpt-4o", "max_concurrency": 8},
+            "local": {"provider": "local", "model": "llama", "options": {"base_url": "http://localhost:8000/v1"}}
+        },
+        "experiments": [
+            {
+                "name": "math",
+                "datasets": ["tests/data/math.csv", "tests/data/math1.csv"],
+                "initial_prompts": ["You are a math teacher", "You're a mathematical assistant"],
+                "student": "gemma",
+                "evaluator": "gpt4o",
+                "augmentator": "gpt4o",
+                "loss": "naive_similarity",
+                "backpropagation": "backpropagation",
+                "epochs": 5
+            }
+        ]
+    }
+
+    An experiment runs once for every combination of its datasets, initial prompts and students
+    (`dataset`, `initial_prompt` and `student` are accepted for single values). Agents also accept
+    `api_key_env`, `cache` (default true), `hedge` (HedgedAgent arguments) and `profile`
+    (GenerationProfile arguments). Experiments also accept `row_sampling` (RowSampler arguments)
+    to evaluate a sample of rows in most epochs, and `profiles`, GenerationProfile arguments per
+    role (`student`, `evaluator`, `augmentator`) that override the agent's profile.
+    """
+    with open(path, 'r') as file:
+        return json.load(file)
+
+def expand_experiments(config: dict) -> List[dict]:
+    """
+    Expand the experiments of a config into one spec per dataset, initial prompt and student.
+
+    Args:
+        config (dict): The experiments config.
+
+    Returns:
+        List[dict]: The expanded experiment specs, each with a unique name.
+    """
+    specs = []
+    for index, experiment in enumerate(config["experiments"]):
+        datasets = experiment.get("datasets", [experiment.get("dataset")])
+        initial_prompts = experiment.get("initial_prompts", [experiment.get("initial_prompt")])
+        students = experiment.get("students", [experiment.get("student")])
+        combinations = list(product(datasets, initial_prompts, students))
+        base_name = experiment.get("name", f"experiment-{index}")
+        for number, (dataset, initial_prompt, student) in enumerate(combinations):
+            spec = {
+                key: value for key, value in experiment.items()
+                if key not in ("datasets", "initial_prompts", "students")
+            }
+            spec.update(dataset=dataset, initial_prompt=initial_prompt, student=student)
+            spec["name"] = base_name if len(combinations) == 1 else f"{base_name}-{number}"
+            specs.append(spec)
+    return specs
+
+def build_runner(config: dict, experiment_specs: List[dict] = None) -> ExperimentRunner:
+    """
+    Build an ExperimentRunner, its shared resources and its experiments from a config.
+
+    Args:
+        config (dict): The experiments config.
+        experiment_specs (List[dict], optional): Expanded experiment specs to build. Defaults to
+            every experiment of the config.
+
+    Returns:
+        ExperimentRunner: The runner, ready to run.
+    """
+    output_dir = config.get("output_dir")
+    results_store = ResultsStore(os.path.join(output_dir, "results")) if output_dir else None
+    runner = ExperimentRunner(
+        max_parallel_jobs=config.get("max_parallel_jobs", 4),
+        cache=ResponseCache(config.get("cache_path")),
+        results_store=results_store,
+        verbose=config.get("verbose", False),
+    )
+
+    agents = {}
+    for name, spec in config["agents"].items():
+        agents[name] = runner.share(_build_agent(name, spec, runner), wrap=False)
+
+    for spec in experiment_specs if experiment_specs is not None else expand_experiments(config):
+        profiles = spec.get("profiles", {})
+
+        def role_agent(role: str) -> Agent:
+            agent = agents[spec[role]]
+            return agent.with_profile(GenerationProfile(**profiles[role])) if role in profiles else agent
+
+        loss_class = LOSS_FUNCTIONS[spec.get("loss", "naive_similarity")]
+        backpropagation_class = BACKPROPAGATIONS[spec.get("backpropagation", "backpropagation")]
+        runner.add(Experiment(
+            name=spec["name"],
+            dataset_path=spec["dataset"],
+            objective_prompt=ObjectivePrompt(spec["initial_prompt"]),
+            student=role_agent("student"),
+            loss_function=loss_class(role_agent("evaluator"), **spec.get("loss_options", {})),
+            backpropagation=backpropagation_class(role_agent("augmentator"), **spec.get("backpropagation_options", {})),
+            epochs=spec.get("epochs", 5),
+            row_sampler=RowSampler(**spec["row_sampling"]) if spec.get("row_sampling") else None,
+            **spec.get("search_options", {})
+        ))
+    return runner
+
+def run_config(config: dict, processes: int = 1) -> pl.DataFrame:
+    """
+    Run every experiment of a config and return the consolidated leaderboard.
+
+    With several processes, the experiments are split evenly between them. Each process builds
+    its own runner; rate limits are divided between the processes, and the response cache is
+    shared through `cache_path` when one is configured. Workers are spawned, so scripts calling
+    this with several processes need an `if __name__ == "__main__":` guard.
+
+    Args:
+        config (dict): The experiments config.
+        processes (int, optional): Number of worker processes. Defaults to 1.
+
+    Returns:
+        pl.DataFrame: The leaderboard, best score first.
+    """
+    specs = expand_experiments(config)
+    if processes <= 1:
+        leaderboard = build_runner(config, specs).run()
+    else:
+        worker_config = _divide_rate_limits(config, processes)
+        chunks = [specs[worker::processes] for worker in range(processes)]
+        # Polars' thread pool does not survive fork, so workers are spawned.
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=processes, mp_context=context) as executor:
+            results = executor.map(_run_chunk, [worker_config] * len(chunks), chunks)
+            leaderboard = make_leaderboard([row for rows in results for row in rows])
+
+    output_dir = config.get("output_dir")
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+        leaderboard.write_csv(os.path.join(output_dir, "leaderboard.csv"))
+    return leaderboard
+
+def _run_chunk(config: dict, specs: List[dict]) -> List[dict]:
+    if not specs:
+        return []
+    return build_runner(config, specs).run().to_dicts()
+
+def _divide_rate_limits(config: dict, processes: int) -> dict:
+    agents = {}
+    for name, spec in config["agents"].items():
+        spec = dict(spec)
+        if spec.get("requests_per_minute"):
+            spec["requests_per_minute"] = spec["requests_per_minute"] / processes
+        if spec.get("max_concurrency"):
+            spec["max_concurrency"] = max(1, math.ceil(spec["max_concurrency"] / processes))
+        agents[name] = spec
+    return {**config, "agents": agents}
+
+def _build_agent(name: str, spec: dict, runner: ExperimentRunner) -> Agent:
+    provider = spec["provider"]
+    options = dict(spec.get("options", {}))
+    if provider in API_KEY_ENVS:
+        options.setdefault("api_key", os.getenv(spec.get("api_key_env", API_KEY_ENVS[provider])))
+    agent = PROVIDERS[provider](model=spec["model"], **options)
+    if spec.get("profile"):
+        agent = agent.with_profile(GenerationProfile(**spec["profile"]))
+
+    runner.rate_limiter.configure(
+        name,
+        requests_per_minute=spec.get("requests_per_minute"),
+        max_concurrency=spec.get("max_concurrency")
+    )
+    agent = RateLimitedAgent(agent, runner.rate_limiter, key=name)
+    if spec.get("hedge"):
+        agent = HedgedAgent(agent, role=name, **spec["hedge"])
+    if spec.get("cache", True):
+        agent = CachedAgent(agent, runner.cache)
+    return agent
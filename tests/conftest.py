@@ -0,0 +1,128 @@
+import asyncio
+import csv
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from prompt_searcher.core import Agent
+
+
+class ConstantAgent(Agent):
+    """Answers every request with the same response."""
+
+    def __init__(self, response: str = "7", model: str = "constant", **kwargs):
+        self.model = model
+        self.response = response
+
+    async def agenerate_response(self, system_message: str, user_message: str) -> str:
+        await asyncio.sleep(0)
+        return self.response
+
+
+@pytest.fixture
+def make_dataset(tmp_path):
+    """Write a CSV dataset of `rows` questions and expected answers and return its path."""
+
+    def make(rows: int = 4) -> str:
+        path = tmp_path / f"dataset-{rows}.csv"
+        with open(path, "w", newline="") as file:
+            writer = csv.writer(file)
+            writer.writerow(["prompt", "response"])
+            for index in range(rows):
+                writer.writerow([f"question {index}", f"expected {index}"])
+        return str(path)
+
+    return make
+
+
+@pytest.fixture
+def dataset_path(make_dataset):
+    return make_dataset()
+
+
+class StandInServer:
+    """A tiny OpenAI-compatible server that echoes the last user message or each prompt."""
+
+    def __init__(self,
+                 delay: float = 0.05,
+                 fail_completions: bool = False,
+                 reverse_choices: bool = False,
+                 delays: list = None):
+        self.delay = delay
+        self.delays = list(delays or [])
+        self.fail_completions = fail_completions
+        self.reverse_choices = reverse_choices
+        self.requests = {"chat": [], "completions": []}
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                # The first requests take `delays`, the others `delay`.
+                threading.Event().wait(server.delays.pop(0) if server.delays else server.delay)
+                if self.path.endswith("/chat/completions"):
+                    server.requests["chat"].append(body)
+                    self._send(200, server.chat_completion(body))
+                elif server.fail_completions:
+                    server.requests["completions"].append(body)
+                    self._send(500, {"error": {"message": "boom", "type": "server_error"}})
+                else:
+                    server.requests["completions"].append(body)
+                    self._send(200, server.completion(body))
+
+            def _send(self, status: int, payload: dict):
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.httpd.server_address[1]}/v1"
+
+    def chat_completion(self, body: dict) -> dict:
+        return {
+            "id": "chat", "object": "chat.completion", "created": 0, "model": body["model"],
+            "choices": [{
+                "index": 0, "finish_reason": "stop",
+                "message": {"role": "assistant", "content": "echo:" + body["messages"][-1]["content"]},
+            }],
+            "usage": {"prompt_tokens": 1, "completion_tokens": 2, "total_tokens": 3},
+        }
+
+    def completion(self, body: dict) -> dict:
+        choices = [
+            {"index": index, "finish_reason": "stop", "text": "echo:" + prompt, "logprobs": None}
+            for index, prompt in enumerate(body["prompt"])
+        ]
+        if self.reverse_choices:
+            choices.reverse()
+        return {"id": "completion", "object": "text_completion", "created": 0, "model": body["model"], "choices": choices}
+
+
+@pytest.fixture
+def make_server():
+    servers = []
+
+    def make(**kwargs) -> StandInServer:
+        server = StandInServer(**kwargs)
+        server.thread.start()
+        servers.append(server)
+        return server
+
+    yield make
+    for server in servers:
+        server.httpd.shutdown()
+        server.httpd.server_close()
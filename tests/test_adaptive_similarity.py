@@ -0,0 +1,112 @@
+import asyncio
+
+import pytest
+
+from prompt_searcher.core import AdaptiveSimilarity, Agent, CachedAgent, ResponseCache, ScoreEstimate
+
+
+class ScriptedJudge(Agent):
+    """Returns scripted verdicts in order, and counts the calls."""
+
+    def __init__(self, verdicts: list[str]):
+        self.model = "judge"
+        self.verdicts = list(verdicts)
+        self.calls = 0
+
+    async def agenerate_response(self, system_message: str, user_message: str) -> str:
+        self.calls += 1
+        return self.verdicts[(self.calls - 1) % len(self.verdicts)]
+
+
+def copies_share_calls(judge: ScriptedJudge) -> ScriptedJudge:
+    # with_profile copies an agent; route the copies' calls back to the original judge.
+    judge.with_profile = lambda profile: judge
+    return judge
+
+
+def score_row(loss: AdaptiveSimilarity, pred: str, true: str) -> ScoreEstimate:
+    return asyncio.run(loss.ascore_row(pred, true))
+
+
+def test_pre_score_matches_final_numbers():
+    loss = AdaptiveSimilarity(ScriptedJudge(["10"]))
+
+    assert loss._pre_score("So the answer is 984.", "There are 984 cubes.") == 10.0
+    assert loss._pre_score("So the answer is 983.", "There are 984 cubes.") == 1.0
+    assert loss._pre_score("1.50", "1.5") == 10.0
+
+
+def test_pre_score_falls_back_to_text_similarity():
+    loss = AdaptiveSimilarity(ScriptedJudge(["10"]))
+
+    assert loss._pre_score("Paris", "paris") == 10.0
+    assert loss._pre_score("xyz", "Paris") < 3.0
+
+
+def test_confident_verdict_that_agrees_with_the_pre_score_is_not_resampled():
+    judge = copies_share_calls(ScriptedJudge(["10"]))
+    loss = AdaptiveSimilarity(judge)
+
+    estimate = score_row(loss, "The answer is 42", "42")
+
+    assert judge.calls == 1
+    assert estimate == 10
+    # A single verdict carries the prior verdict variance, not zero.
+    assert estimate.variance == pytest.approx(loss.prior_variance)
+
+
+@pytest.mark.parametrize("verdicts, pred, true", [
+    (["5", "5"], "The answer is 42", "42"),         # borderline
+    (["10", "10"], "The answer is 41", "42"),       # disagrees with the pre-score
+    (["not a number", "9", "9"], "42", "42"),       # unparsable
+])
+def test_uncertain_verdicts_are_resampled_until_stable(verdicts, pred, true):
+    judge = copies_share_calls(ScriptedJudge(verdicts))
+    loss = AdaptiveSimilarity(judge)
+
+    estimate = score_row(loss, pred, true)
+
+    assert judge.calls == len(verdicts)
+    assert estimate.samples == 2
+    assert loss.get_sample_stats()["resampled_rows"] == 1
+
+
+def test_resampling_stops_at_max_samples():
+    judge = copies_share_calls(ScriptedJudge(["2", "9"]))
+    loss = AdaptiveSimilarity(judge, max_samples=4, stable_stderr=0.1)
+
+    estimate = score_row(loss, "an answer", "a desired answer")
+
+    assert judge.calls == 4
+    assert estimate == pytest.approx(5.5)
+    assert loss.verdict_variance() > loss.prior_variance
+
+
+def test_aggregate_has_no_float_drift():
+    loss = AdaptiveSimilarity(ScriptedJudge(["10"]))
+
+    score = loss.aggregate([ScoreEstimate(10, 0.0)] * 19)
+
+    assert score == 10.0
+    assert not loss.winner(10, score)
+
+
+def test_winner_requires_a_margin_above_the_noise():
+    loss = AdaptiveSimilarity(ScriptedJudge(["10"]), noise_margin=1.0)
+
+    assert not loss.winner(ScoreEstimate(7.0, 0.04), ScoreEstimate(7.2, 0.04))
+    assert loss.winner(ScoreEstimate(7.0, 0.04), ScoreEstimate(7.5, 0.04))
+    assert not loss.winner(7.0, 7.005)
+    assert loss.winner(7.0, 7.1)
+
+
+def test_sample_models_follow_a_replaced_evaluator():
+    loss = AdaptiveSimilarity(ScriptedJudge(["5"]), max_samples=3)
+    shared = CachedAgent(ScriptedJudge(["5"]), ResponseCache())
+
+    loss.model = shared
+
+    models = loss.sample_models()
+    assert len(models) == 2
+    assert all(isinstance(model, CachedAgent) and model.cache is shared.cache for model in models)
+    assert [model.profile.seed for model in models] == [1, 2]
@@ -0,0 +1,116 @@
+import asyncio
+import random
+
+import pytest
+from prompt_searcher.core import Agent, Backpropagation, LossFunction, ObjectivePrompt, OpenAIAgent, PromptSearch
+
+from conftest import ConstantAgent
+
+
+class EchoAgent(Agent):
+    def __init__(self, fail_on: str = None):
+        self.model = "echo"
+        self.fail_on = fail_on
+
+    async def agenerate_response(self, system_message: str, user_message: str) -> str:
+        await asyncio.sleep(random.random() / 100)
+        if self.fail_on is not None and self.fail_on in user_message:
+            raise RuntimeError(f"failed on {user_message}")
+        return f"answer {user_message}"
+
+
+class RecordingLoss(LossFunction):
+    """Scores the whole set at once and remembers what it was given."""
+
+    def __init__(self):
+        self.calls = []
+
+    def score(self, y_pred, y_true) -> float:
+        self.calls.append((list(y_pred), list(y_true)))
+        return 1.0
+
+    def winner(self, previous_loss, new_loss) -> bool:
+        return new_loss > previous_loss
+
+
+def test_generate_many_keeps_request_order():
+    requests = [("system", f"message {index}") for index in range(30)]
+
+    responses = asyncio.run(EchoAgent().generate_many(requests, max_concurrency=4))
+
+    assert responses == [f"answer message {index}" for index in range(30)]
+
+
+def test_generate_many_returns_exceptions_in_place():
+    requests = [("system", f"message {index}") for index in range(5)]
+
+    responses = asyncio.run(EchoAgent(fail_on="message 3").generate_many(requests, return_exceptions=True))
+
+    assert isinstance(responses[3], RuntimeError)
+    assert [response for index, response in enumerate(responses) if index != 3] == [
+        f"answer message {index}" for index in (0, 1, 2, 4)
+    ]
+
+
+def test_generate_many_raises_without_return_exceptions():
+    with pytest.raises(RuntimeError):
+        asyncio.run(EchoAgent(fail_on="message 1").generate_many([("system", "message 1")]))
+
+
+def test_failed_rows_are_dropped_with_their_expected_answer(dataset_path):
+    loss = RecordingLoss()
+    search = PromptSearch(
+        dataset_path=dataset_path,
+        student=EchoAgent(fail_on="question 2"),
+        loss_function=loss,
+        backpropagation=Backpropagation(ConstantAgent("a better prompt")),
+        objective_prompt=ObjectivePrompt("initial prompt"),
+        epochs=1,
+        verbose=False,
+    )
+
+    search.train()
+
+    y_pred, y_true = loss.calls[0]
+    assert len(y_pred) == len(y_true) == 3
+    for pred, true in zip(y_pred, y_true):
+        assert pred.removeprefix("answer question ") == true.removeprefix("expected ")
+
+
+def test_train_works_inside_a_running_event_loop(dataset_path):
+    search = PromptSearch(
+        dataset_path=dataset_path,
+        student=EchoAgent(),
+        loss_function=RecordingLoss(),
+        backpropagation=Backpropagation(ConstantAgent("a better prompt")),
+        objective_prompt=ObjectivePrompt("initial prompt"),
+        epochs=1,
+        verbose=False,
+    )
+
+    async def host():
+        search.train()
+
+    asyncio.run(host())
+
+    assert search.score_history == [1.0]
+
+
+def test_train_twice_with_the_same_http_agent(dataset_path, make_server):
+    server = make_server(delay=0.01)
+    search = PromptSearch(
+        dataset_path=dataset_path,
+        student=OpenAIAgent(model="student", api_key="test", base_url=server.base_url),
+        loss_function=RecordingLoss(),
+        backpropagation=Backpropagation(ConstantAgent("a better prompt")),
+        objective_prompt=ObjectivePrompt("initial prompt"),
+        epochs=1,
+        verbose=False,
+    )
+
+    search.train()
+    search.train()
+
+    assert search.score_history == [1.0, 1.0]
+    assert len(server.requests["chat"]) == 8
+    assert search.score_function.calls[1][0] == [f"echo:question {index}" for index in range(4)]
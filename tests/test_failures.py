@@ -0,0 +1,82 @@
+from prompt_searcher.core import Backpropagation, LossFunction, NaiveSimilarity, ObjectivePrompt, PromptSearch
+
+from conftest import ConstantAgent
+
+
+class RecordingBackpropagation(Backpropagation):
+    def __init__(self):
+        super().__init__(ConstantAgent("a better prompt"))
+        self.failures = []
+
+    async def aoptimize_prompt(self, current_prompt, score, previous_prompt, failures=None):
+        self.failures.append(failures)
+        return "a better prompt"
+
+
+def make_search(dataset_path, loss_function):
+    return PromptSearch(
+        dataset_path=dataset_path,
+        student=ConstantAgent("an answer"),
+        loss_function=loss_function,
+        backpropagation=RecordingBackpropagation(),
+        objective_prompt=ObjectivePrompt("initial prompt"),
+        epochs=1,
+        verbose=False,
+    )
+
+
+def test_prompt_failing_every_row_equally_passes_every_row(dataset_path):
+    search = make_search(dataset_path, NaiveSimilarity(ConstantAgent("2")))
+
+    search.train()
+
+    failures = search.backpropagation.failures[0]
+    assert len(failures) == 4
+    assert all(row[3] == 2 for row in failures)
+
+
+def test_perfect_rows_are_not_failures(dataset_path):
+    search = make_search(dataset_path, NaiveSimilarity(ConstantAgent("10")))
+
+    search.train()
+
+    assert search.backpropagation.failures[0] == []
+
+
+def test_failures_are_ordered_worst_first(dataset_path):
+    search = make_search(dataset_path, NaiveSimilarity(ConstantAgent("10")))
+    rows = [("a", "x", "y", 7), ("b", "x", "y", 10), ("c", "x", "y", 3), ("d", "x", "y", None), ("e", "x", "y", 9)]
+
+    # The unscored row counts as the worst score, as in the aggregate.
+    assert [row[0] for row in search._failures(rows)] == ["d", "c", "a", "e"]
+
+
+class ErrorRate(LossFunction):
+    """A lower-is-better loss with no known best row score."""
+
+    def winner(self, previous_loss, new_loss) -> bool:
+        return new_loss < previous_loss
+
+
+def test_failures_without_a_known_scale(dataset_path):
+    search = make_search(dataset_path, NaiveSimilarity(ConstantAgent("10")))
+    search.score_function = ErrorRate()
+
+    spread = [("a", "x", "y", 0.5), ("b", "x", "y", 0.1), ("c", "x", "y", 0.9)]
+    tied = [("a", "x", "y", 0.4), ("b", "x", "y", 0.4)]
+
+    unscored = [("a", "x", "y", None), ("b", "x", "y", 0.4)]
+
+    assert [row[0] for row in search._failures(spread)] == ["c", "a"]
+    assert [row[0] for row in search._failures(tied)] == ["a", "b"]
+    assert [row[0] for row in search._failures(unscored)] == ["a", "b"]
+
+
+def test_unparsable_verdicts_are_failures(dataset_path):
+    search = make_search(dataset_path, NaiveSimilarity(ConstantAgent("not a score")))
+
+    search.train()
+
+    failures = search.backpropagation.failures[0]
+    assert len(failures) == 4
+    assert all(row[3] is None for row in failures)
@@ -0,0 +1,108 @@
+import asyncio
+
+import pytest
+
+from prompt_searcher.core import AnthropicAgent, CachedAgent, GenerationProfile, ResponseCache
+
+from conftest import ConstantAgent
+
+
+def test_request_options_leave_out_unset_fields():
+    profile = GenerationProfile(max_tokens=64, stop=["\n"], stream=True, max_chars=10)
+
+    assert profile.request_options() == {"max_tokens": 64, "stop": ["\n"]}
+    assert GenerationProfile().request_options() == {}
+
+
+def test_anthropic_request_uses_messages_api_parameters():
+    profile = GenerationProfile(max_tokens=64, stop=["END"], temperature=0.2, seed=3)
+    agent = AnthropicAgent(model="claude", api_key="test").with_profile(profile)
+
+    assert agent._request("system", "user") == {
+        "model": "claude",
+        "system": "system",
+        "messages": [{"role": "user", "content": "user"}],
+        "max_tokens": 64,
+        "stop_sequences": ["END"],
+        "temperature": 0.2,
+    }
+
+
+def test_anthropic_request_max_tokens_defaults_and_overrides():
+    agent = AnthropicAgent(model="claude", api_key="test")
+
+    assert agent._request("system", "user")["max_tokens"] == 1024
+    profiled = agent.with_profile(GenerationProfile(max_tokens=64))
+
+    assert profiled._request("system", "user", max_tokens=8)["max_tokens"] == 8
+    assert profiled._request("system", "user")["max_tokens"] == 64
+    assert agent._request("system", "user")["max_tokens"] == 1024
+
+
+@pytest.mark.parametrize("profile, chunks, expected, read", [
+    (GenerationProfile(stop=["END"]), ["The answer", " is 4 E", "ND and more", " text"], "The answer is 4 ", 3),
+    (GenerationProfile(max_chars=8), ["The ", "answer ", "is 4"], "The answ", 2),
+    (GenerationProfile(stop=["\n"], max_chars=8), ["4\n", "and more"], "4", 1),
+    (GenerationProfile(max_chars=100), ["The ", None, "answer"], "The answer", 3),
+])
+def test_collect_stops_at_a_stop_sequence_or_max_chars(profile, chunks, expected, read):
+    consumed = []
+
+    def stream():
+        for chunk in chunks:
+            consumed.append(chunk)
+            yield chunk
+
+    async def astream():
+        for chunk in stream():
+            yield chunk
+
+    assert profile.collect(stream()) == expected
+    assert len(consumed) == read
+    consumed.clear()
+    assert asyncio.run(profile.acollect(astream())) == expected
+    assert len(consumed) == read
+
+
+def test_replace_copies_the_profile():
+    profile = GenerationProfile(max_tokens=64, temperature=0.2)
+
+    changed = profile.replace(temperature=0.7, seed=1)
+
+    assert (changed.max_tokens, changed.temperature, changed.seed) == (64, 0.7, 1)
+    assert (profile.temperature, profile.seed) == (0.2, None)
+    with pytest.raises(AttributeError):
+        profile.replace(top_p=0.9)
+
+
+def test_to_dict_changes_the_cache_key():
+    agent = CachedAgent(ConstantAgent("answer"), ResponseCache())
+    keys = {
+        agent.with_profile(profile)._cache_key("system", "user")
+        for profile in [
+            GenerationProfile(),
+            GenerationProfile(max_tokens=64),
+            GenerationProfile(temperature=0.7),
+            GenerationProfile(temperature=0.7, seed=1),
+            GenerationProfile(stream=True, max_chars=10),
+        ]
+    }
+
+    assert len(keys) == 5
+    # The timeout does not change the generated text.
+    assert agent.with_profile(GenerationProfile(timeout=5))._cache_key("system", "user") == agent._cache_key("system", "user")
+
+
+def test_with_profile_leaves_the_original_unchanged():
+    inner = ConstantAgent("answer")
+    agent = CachedAgent(inner, ResponseCache())
+    profile = GenerationProfile(max_tokens=64)
+
+    copy = agent.with_profile(profile)
+
+    assert copy.profile is profile
+    assert copy.agent.profile is profile
+    assert copy.agent is not inner
+    assert agent.profile.max_tokens is None
+    assert inner.profile.max_tokens is None
+    assert copy.cache is agent.cache
@@ -0,0 +1,68 @@
+import asyncio
+
+import pytest
+
+from prompt_searcher.core import Agent, CachedAgent, HedgedAgent, LocalAgent, ResponseCache
+
+
+class SlowFirstAgent(Agent):
+    """Answers quickly, except for the first `slow_calls` calls."""
+
+    def __init__(self, slow_calls: int, slow: float = 0.3, fast: float = 0.01):
+        self.model = "slow-first"
+        self.slow_calls = slow_calls
+        self.slow = slow
+        self.fast = fast
+        self.calls = 0
+
+    async def agenerate_response(self, system_message: str, user_message: str) -> str:
+        self.calls += 1
+        await asyncio.sleep(self.slow if self.calls <= self.slow_calls else self.fast)
+        return "response"
+
+
+def test_hedged_request_records_latency_from_first_launch():
+    agent = HedgedAgent(SlowFirstAgent(slow_calls=0), max_hedge_ratio=1.0, min_samples=1)
+    agent._latencies.append(0.05)
+
+    async def run():
+        agent.agent.slow_calls = agent.agent.calls + 1
+        return await agent.agenerate_response("system", "user")
+
+    assert asyncio.run(run()) == "response"
+
+    assert agent.hedges == 1
+    assert agent.hedge_wins == 1
+    # The hedge itself took ~0.01s, but the request as a whole took at least the hedge delay.
+    assert agent._latencies[-1] >= 0.05
+
+
+def test_hedge_delay_does_not_drift_below_slow_originals():
+    agent = HedgedAgent(SlowFirstAgent(slow_calls=0, fast=0.02), percentile=0.5, max_hedge_ratio=1.0, min_samples=5)
+
+    async def run():
+        for _ in range(5):
+            await agent.agenerate_response("system", "user")
+        delay = agent.hedge_delay()
+        for _ in range(5):
+            agent.agent.slow_calls = agent.agent.calls + 1
+            await agent.agenerate_response("system", "user")
+        return delay
+
+    delay = asyncio.run(run())
+
+    assert agent.hedge_delay() >= delay
+
+
+@pytest.mark.parametrize("wrap", [lambda agent: agent, lambda agent: CachedAgent(agent, ResponseCache())], ids=["local", "cached"])
+def test_hedge_is_not_coalesced_with_the_slow_request(make_server, wrap):
+    server = make_server(delay=0.01, delays=[0.5])
+    local = LocalAgent(model="local", base_url=server.base_url)
+    agent = HedgedAgent(wrap(local), max_hedge_ratio=1.0, min_samples=1)
+    agent._latencies.append(0.05)
+
+    assert asyncio.run(agent.agenerate_response("system", "question")) == "echo:question"
+
+    assert local.server_requests == 2
+    assert agent.hedges == 1
+    assert agent.hedge_wins == 1
@@ -0,0 +1,94 @@
+import asyncio
+import math
+
+import pytest
+
+from prompt_searcher.core import LocalAgent
+
+
+def test_identical_concurrent_calls_share_one_request(make_server):
+    server = make_server()
+    agent = LocalAgent(model="local", base_url=server.base_url)
+
+    async def run():
+        return await asyncio.gather(*(agent.agenerate_response("system", "same question") for _ in range(10)))
+
+    responses = asyncio.run(run())
+
+    assert responses == ["echo:same question"] * 10
+    assert len(server.requests["chat"]) == 1
+    assert agent.server_requests == 1
+
+
+def test_distinct_calls_are_not_coalesced(make_server):
+    server = make_server()
+    agent = LocalAgent(model="local", base_url=server.base_url)
+
+    async def run():
+        return await asyncio.gather(*(agent.agenerate_response("system", f"question {index}") for index in range(4)))
+
+    assert asyncio.run(run()) == [f"echo:question {index}" for index in range(4)]
+    assert len(server.requests["chat"]) == 4
+
+
+@pytest.mark.parametrize("count, batch_size", [(10, 4), (16, 16), (5, 8)])
+def test_prompt_template_batches_requests(make_server, count, batch_size):
+    server = make_server()
+    agent = LocalAgent(
+        model="local", base_url=server.base_url,
+        prompt_template="{system_message}|{user_message}", batch_size=batch_size, batch_window=0.05
+    )
+
+    async def run():
+        return await asyncio.gather(*(agent.agenerate_response("system", f"question {index}") for index in range(count)))
+
+    responses = asyncio.run(run())
+
+    assert responses == [f"echo:system|question {index}" for index in range(count)]
+    assert len(server.requests["completions"]) == math.ceil(count / batch_size)
+    assert not server.requests["chat"]
+
+
+def test_batched_choices_are_mapped_back_by_index(make_server):
+    server = make_server(reverse_choices=True)
+    agent = LocalAgent(
+        model="local", base_url=server.base_url,
+        prompt_template="{user_message}", batch_size=8, batch_window=0.05
+    )
+
+    async def run():
+        return await asyncio.gather(*(agent.agenerate_response("system", f"question {index}") for index in range(6)))
+
+    assert asyncio.run(run()) == [f"echo:question {index}" for index in range(6)]
+    assert len(server.requests["completions"]) == 1
+
+
+def test_batch_error_reaches_every_waiter(make_server):
+    server = make_server(fail_completions=True)
+    agent = LocalAgent(
+        model="local", base_url=server.base_url, max_retries=0,
+        prompt_template="{user_message}", batch_size=8, batch_window=0.05
+    )
+
+    async def run():
+        return await asyncio.gather(
+            *(agent.agenerate_response("system", f"question {index}") for index in range(5)),
+            return_exceptions=True
+        )
+
+    results = asyncio.run(run())
+
+    assert len(server.requests["completions"]) == 1
+    assert len(results) == 5
+    assert all(isinstance(result, Exception) for result in results)
+
+
+def test_agent_works_across_event_loops(make_server):
+    server = make_server(delay=0.01)
+    agent = LocalAgent(model="local", base_url=server.base_url)
+
+    first = asyncio.run(agent.agenerate_response("system", "first"))
+    second = asyncio.run(agent.agenerate_response("system", "second"))
+
+    assert (first, second) == ("echo:first", "echo:second")
+    assert len(server.requests["chat"]) == 2
@@ -0,0 +1,134 @@
+import os
+
+import pytest
+
+from prompt_searcher.core import Backpropagation, NaiveSimilarity, ObjectivePrompt, PromptSearch, ResultsStore
+
+from conftest import ConstantAgent
+
+
+def fill(store: ResultsStore, run_id: str, epoch: int, candidate: str, scores: list) -> None:
+    for row, score in enumerate(scores):
+        store.record(run_id, epoch, candidate, row, f"answer {row}", score, latency=0.5, tokens=10)
+
+
+def partitions(path) -> dict:
+    files = {}
+    for directory, _, names in os.walk(path):
+        parquet = [name for name in names if name.endswith(".parquet")]
+        if parquet:
+            files[os.path.relpath(directory, path)] = len(parquet)
+    return files
+
+
+def test_flush_writes_one_file_per_run_and_epoch(tmp_path):
+    store = ResultsStore(str(tmp_path), flush_every=100)
+    fill(store, "run", 1, "a", [5, 6])
+    fill(store, "run", 2, "b", [7])
+    fill(store, "other", 1, "a", [8])
+
+    store.flush()
+
+    assert len(store) == 0
+    assert partitions(tmp_path) == {
+        os.path.join("run_id=run", "epoch=1"): 1,
+        os.path.join("run_id=run", "epoch=2"): 1,
+        os.path.join("run_id=other", "epoch=1"): 1,
+    }
+
+
+def test_record_flushes_when_the_buffer_is_full(tmp_path):
+    store = ResultsStore(str(tmp_path), flush_every=3)
+
+    fill(store, "run", 1, "a", [1, 2, 3, 4])
+
+    assert len(store) == 1
+    assert partitions(tmp_path) == {os.path.join("run_id=run", "epoch=1"): 1}
+
+
+def test_scan_reads_flushed_and_buffered_records(tmp_path):
+    store = ResultsStore(str(tmp_path), flush_every=100)
+    assert store.scan().collect().height == 0
+
+    fill(store, "run", 1, "a", [5, 6])
+    store.flush()
+    fill(store, "run", 2, "b", [7, None])
+
+    records = store.scan().sort(["epoch", "row"]).collect()
+
+    assert dict(records.schema) == ResultsStore.SCHEMA
+    assert records["candidate"].to_list() == ["a", "a", "b", "b"]
+    assert records["score"].to_list() == [5.0, 6.0, 7.0, None]
+
+
+def test_unparsable_verdicts_are_stored_as_null_scores(tmp_path, dataset_path):
+    store = ResultsStore(str(tmp_path / "results"))
+    search = PromptSearch(
+        dataset_path=dataset_path,
+        student=ConstantAgent("an answer"),
+        loss_function=NaiveSimilarity(ConstantAgent("not a score")),
+        backpropagation=Backpropagation(ConstantAgent("a better prompt")),
+        objective_prompt=ObjectivePrompt("initial prompt"),
+        epochs=1,
+        verbose=False,
+        results_store=store,
+        run_id="run",
+    )
+
+    search.train()
+
+    records = store.scan().collect()
+    assert records.height == 4
+    assert records["score"].null_count() == 4
+    assert records["response"].to_list() == ["an answer"] * 4
+    summary = store.candidate_summary("run").row(0, named=True)
+    assert (summary["mean_score"], summary["unscored_rows"]) == (0.0, 4)
+
+
+def test_candidate_summary(tmp_path):
+    store = ResultsStore(str(tmp_path))
+    fill(store, "run", 1, "a", [4, None, 8])
+    store.flush()
+    fill(store, "run", 2, "b", [9, 9])
+    fill(store, "other", 1, "c", [10])
+
+    summary = store.candidate_summary("run")
+
+    assert summary.to_dicts() == [
+        {"run_id": "run", "candidate": "b", "mean_score": 9.0, "rows": 2, "unscored_rows": 0,
+         "mean_latency": 0.5, "total_tokens": 20},
+        {"run_id": "run", "candidate": "a", "mean_score": 4.0, "rows": 3, "unscored_rows": 1,
+         "mean_latency": 0.5, "total_tokens": 30},
+    ]
+    assert store.candidate_summary()["candidate"].to_list() == ["c", "b", "a"]
+
+
+def test_paired_comparison_uses_rows_scored_by_both_prompts(tmp_path):
+    store = ResultsStore(str(tmp_path))
+    fill(store, "run", 1, "a", [4, 8, 6, None])
+    fill(store, "run", 2, "a", [6, 8])
+    store.flush()
+    fill(store, "run", 3, "b", [5, 5, 6, 9, 9])
+    fill(store, "other", 1, "b", [0, 0, 0])
+
+    comparison = store.paired_comparison("a", "b", run_id="run")
+
+    # Row 0 of "a" is averaged over two epochs; rows 3 and 4 lack a score of "a".
+    assert comparison["row"].to_list() == [0, 1, 2]
+    assert comparison["score_a"].to_list() == [5.0, 8.0, 6.0]
+    assert comparison["score_b"].to_list() == [5.0, 5.0, 6.0]
+    assert comparison["difference"].to_list() == [0.0, 3.0, 0.0]
+
+
+def test_paired_summary(tmp_path):
+    store = ResultsStore(str(tmp_path))
+    fill(store, "run", 1, "a", [4, 8, 6, 2])
+    fill(store, "run", 2, "b", [5, 5, 6, 1])
+
+    summary = store.paired_summary("a", "b", run_id="run")
+
+    assert {key: summary[key] for key in ("rows", "wins_a", "wins_b", "ties")} == {
+        "rows": 4, "wins_a": 2, "wins_b": 1, "ties": 1
+    }
+    assert summary["mean_difference"] == pytest.approx(0.75)
+    assert summary["std_difference"] == pytest.approx(1.707825, rel=1e-5)
@@ -0,0 +1,78 @@
+import random
+import statistics
+
+import pytest
+
+from prompt_searcher.core import Backpropagation, NaiveSimilarity, ObjectivePrompt, PromptSearch, RowSampler
+
+from conftest import ConstantAgent
+
+
+def aggregate(sampler, row_scores, probabilities, num_rows):
+    scores, weights = sampler.estimate_terms(row_scores, probabilities, num_rows)
+    return NaiveSimilarity(None).aggregate(scores, weights)
+
+
+def trained_sampler(num_rows: int, seed: int = 0) -> tuple[RowSampler, dict]:
+    rng = random.Random(seed)
+    sampler = RowSampler(sample_fraction=0.5, seed=seed)
+    base = {index: rng.randint(1, 10) for index in range(num_rows)}
+    for _ in range(4):
+        scores = {index: max(1, min(10, score + rng.randint(-2, 2))) for index, score in base.items()}
+        sampler.update(scores, sum(scores.values()) / num_rows)
+    return sampler, base
+
+
+def test_uniform_shift_is_estimated_exactly():
+    sampler, _ = trained_sampler(20)
+    means = sampler.row_means(20)
+
+    for _ in range(50):
+        indices, probabilities = sampler.plan(5, 20)
+        if probabilities is None:
+            continue
+        estimate = aggregate(sampler, {index: means[index] + 1.5 for index in indices}, probabilities, 20)
+        assert estimate == pytest.approx(sum(means) / 20 + 1.5)
+
+
+def test_estimate_is_close_to_unbiased_with_low_variance():
+    sampler, base = trained_sampler(20)
+    rng = random.Random(1)
+    truth = {index: max(1, min(10, score + rng.randint(-3, 3))) for index, score in base.items()}
+    full_mean = sum(truth.values()) / 20
+
+    estimates = []
+    for _ in range(2000):
+        indices, probabilities = sampler.plan(5, 20)
+        if probabilities is not None:
+            estimates.append(aggregate(sampler, {index: truth[index] for index in indices}, probabilities, 20))
+
+    assert statistics.mean(estimates) == pytest.approx(full_mean, abs=0.2)
+    assert statistics.stdev(estimates) < 1.0
+
+
+def test_missing_rows_are_left_out_like_a_full_evaluation():
+    sampler = RowSampler()
+    sampler.update({index: 5 for index in range(4)}, 5.0)
+    probabilities = {0: 0.5, 1: 0.5, 2: 0.5}
+
+    # Row 2 failed to generate: the estimate is the mean of the rows that were scored.
+    assert aggregate(sampler, {0: 8, 1: 8}, probabilities, 4) == pytest.approx(8.0)
+
+
+def test_perfect_prompt_keeps_a_perfect_sampled_score(make_dataset):
+    sampler = RowSampler(sample_fraction=0.3, warmup_epochs=1, full_eval_every=0, seed=3)
+    search = PromptSearch(
+        dataset_path=make_dataset(20),
+        student=ConstantAgent("an answer"),
+        loss_function=NaiveSimilarity(ConstantAgent("10")),
+        backpropagation=Backpropagation(ConstantAgent("another prompt")),
+        objective_prompt=ObjectivePrompt("initial prompt"),
+        epochs=5,
+        verbose=False,
+        row_sampler=sampler,
+    )
+
+    search.train()
+
+    assert search.score_history == pytest.approx([10.0] * 5)
@@ -0,0 +1,101 @@
+import asyncio
+
+from prompt_searcher.core import (
+    Agent,
+    Backpropagation,
+    CachedAgent,
+    GenerationProfile,
+    NaiveSimilarity,
+    ObjectivePrompt,
+    RateLimitedAgent,
+    RateLimiter,
+)
+from prompt_searcher.training import runner as runner_module
+from prompt_searcher.training.runner import Experiment, ExperimentRunner, build_runner
+
+from conftest import ConstantAgent
+
+
+def wrapper_chain(agent: Agent) -> list:
+    chain = []
+    while isinstance(agent, Agent):
+        chain.append(agent)
+        agent = getattr(agent, "agent", None)
+    return chain
+
+
+def test_share_does_not_rewrap_profiled_copies_of_shared_agents():
+    runner = ExperimentRunner()
+    shared = runner.share(ConstantAgent(model="judge"))
+    profiled = shared.with_profile(GenerationProfile(max_tokens=4))
+
+    assert runner.share(profiled) is profiled
+    assert sum(isinstance(agent, CachedAgent) for agent in wrapper_chain(profiled)) == 1
+
+
+def test_build_runner_role_profiles_keep_the_agent_rate_limiter_key(dataset_path, monkeypatch):
+    monkeypatch.setitem(runner_module.PROVIDERS, "fake", ConstantAgent)
+    config = {
+        "agents": {"judge": {"provider": "fake", "model": "judge-model"}},
+        "experiments": [{
+            "name": "profiles",
+            "dataset": dataset_path,
+            "initial_prompt": "initial prompt",
+            "student": "judge",
+            "evaluator": "judge",
+            "augmentator": "judge",
+            "epochs": 1,
+            "profiles": {"evaluator": {"max_tokens": 4}},
+        }],
+    }
+    runner = build_runner(config)
+    evaluator = runner.experiments[0].loss_function.model
+
+    assert runner.share(evaluator) is evaluator
+    chain = wrapper_chain(evaluator)
+    assert sum(isinstance(agent, CachedAgent) for agent in chain) == 1
+    assert [agent.key for agent in chain if isinstance(agent, RateLimitedAgent)] == ["judge"]
+    assert chain[-1].profile.max_tokens == 4
+
+
+def test_run_does_not_mutate_the_callers_objects(dataset_path):
+    judge = ConstantAgent(model="judge")
+    augmentator = ConstantAgent("a better prompt", model="augmentator")
+    loss_function = NaiveSimilarity(judge)
+    backpropagation = Backpropagation(augmentator)
+    objective_prompt = ObjectivePrompt("initial prompt")
+    runner = ExperimentRunner([Experiment(
+        name="experiment",
+        dataset_path=dataset_path,
+        objective_prompt=objective_prompt,
+        student=ConstantAgent("an answer", model="student"),
+        loss_function=loss_function,
+        backpropagation=backpropagation,
+        epochs=1,
+    )])
+
+    leaderboard = runner.run()
+    rerun = runner.run()
+
+    assert leaderboard["best_score"].to_list() == rerun["best_score"].to_list() == [7.0]
+    assert rerun["initial_prompt"].to_list() == ["initial prompt"]
+    assert loss_function.model is judge
+    assert loss_function.score_history == []
+    assert backpropagation.model is augmentator
+    assert objective_prompt.get_last_prompt() == "initial prompt"
+    assert objective_prompt.get_history() == [("initial prompt", None)]
+
+
+def test_rate_limiter_is_reused_across_event_loops():
+    limiter = RateLimiter()
+    limiter.configure("judge", max_concurrency=1)
+
+    async def contend():
+        async def request():
+            async with limiter.limit("judge"):
+                await asyncio.sleep(0.01)
+
+        await asyncio.gather(*(request() for _ in range(3)))
+
+    asyncio.run(contend())
+    asyncio.run(contend())
@@ -0,0 +1,162 @@
+import asyncio
+
+import pytest
+
+from prompt_searcher.core import Agent, Backpropagation, NaiveSimilarity, ObjectivePrompt, PromptSearch
+
+from conftest import ConstantAgent
+
+
+class PromptEchoAgent(Agent):
+    """A student that answers with the prompt it was given and the question."""
+
+    def __init__(self):
+        self.model = "student"
+
+    async def agenerate_response(self, system_message: str, user_message: str) -> str:
+        # Slower than the judge, so each row is judged before the next answer arrives.
+        await asyncio.sleep(0.01)
+        return f"[{system_message}] {user_message}"
+
+
+class ScriptedJudge(Agent):
+    """Scores an answer with `script(prompt, question)`, which can also raise or block."""
+
+    def __init__(self, script):
+        self.model = "judge"
+        self.script = script
+        self.cancelled = 0
+
+    async def agenerate_response(self, system_message: str, user_message: str) -> str:
+        answer = user_message.split("Given this answer: ", 1)[1].split("\n", 1)[0]
+        prompt, question = answer[1:].split("] ", 1)
+        try:
+            return str(await self.script(prompt, question))
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+
+
+class ScriptedBackpropagation(Backpropagation):
+    """Returns the scripted prompts in order and records every call.
+
+    Optimizations after a losing prompt, which include the speculative ones, take `losing_delay` seconds.
+    """
+
+    def __init__(self, prompts: list, losing_delay: float = 0.0):
+        super().__init__(ConstantAgent("unused"))
+        self.prompts = list(prompts)
+        self.losing_delay = losing_delay
+        self.calls = []
+        self.cancelled = 0
+
+    async def aoptimize_prompt(self, current_prompt, score, previous_prompt, failures=None):
+        self.calls.append((previous_prompt, len(failures)))
+        try:
+            await asyncio.sleep(0 if previous_prompt is None else self.losing_delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        return self.prompts.pop(0)
+
+
+def scores(table: dict):
+    """A judge script giving every row of a prompt the same score, or one score per row."""
+
+    async def script(prompt: str, question: str) -> int:
+        score = table[prompt]
+        return score[int(question.split()[-1])] if isinstance(score, list) else score
+
+    return script
+
+
+def make_search(dataset_path, script, backpropagation, **kwargs) -> PromptSearch:
+    return PromptSearch(
+        dataset_path=dataset_path,
+        student=PromptEchoAgent(),
+        loss_function=NaiveSimilarity(ScriptedJudge(script)),
+        backpropagation=backpropagation,
+        objective_prompt=ObjectivePrompt("good"),
+        epochs=2,
+        verbose=False,
+        max_concurrency=1,
+        speculation_threshold=kwargs.pop("speculation_threshold", 0.5),
+        **kwargs
+    )
+
+
+def test_losing_candidate_uses_the_speculative_prompt(dataset_path):
+    backpropagation = ScriptedBackpropagation(["bad", "speculated"])
+    search = make_search(dataset_path, scores({"good": 8, "bad": 2}), backpropagation)
+
+    search.train()
+
+    assert search.score_history == [8, 2]
+    # The second optimization started after half of the losing rows were judged, and was used as is.
+    assert backpropagation.calls == [(None, 4), ("bad", 2)]
+    assert backpropagation.cancelled == 0
+    assert search.objective_prompt.get_last_prompt() == "speculated"
+
+
+def test_winning_candidate_discards_the_speculation(dataset_path):
+    backpropagation = ScriptedBackpropagation(["late", "fresh"], losing_delay=0.2)
+    search = make_search(dataset_path, scores({"good": 5, "late": [1, 1, 10, 10]}), backpropagation)
+
+    search.train()
+
+    assert search.score_history == [5, 5.5]
+    assert search.best_prompt == "late"
+    # Speculated after two rows scored 1, cancelled once the candidate won, then optimized
+    # afresh from the two rows that fell short.
+    assert backpropagation.calls == [(None, 4), ("late", 2), (None, 2)]
+    assert backpropagation.cancelled == 1
+    assert search.objective_prompt.get_last_prompt() == "fresh"
+
+
+def test_judge_error_cancels_the_judges_and_the_speculation(dataset_path):
+    async def script(prompt: str, question: str) -> int:
+        if prompt == "good":
+            return 8
+        if question == "question 2":
+            raise RuntimeError("judge failed")
+        if question == "question 3":
+            await asyncio.Event().wait()
+        return 1
+
+    backpropagation = ScriptedBackpropagation(["bad"], losing_delay=10)
+    search = make_search(dataset_path, script, backpropagation, judge_concurrency=2)
+
+    async def run():
+        await search.atrain()
+        await asyncio.sleep(0.01)
+        return asyncio.all_tasks() - {asyncio.current_task()}
+
+    assert asyncio.run(run()) == set()
+    assert search.score_history == [8]
+    assert backpropagation.calls == [(None, 4), ("bad", 2)]
+    assert backpropagation.cancelled == 1
+    assert search.score_function.model.cancelled == 1
+
+
+@pytest.mark.parametrize("threshold, judged", [(0.25, 1), (0.5, 2), (0.75, 3), (1.0, 4)])
+def test_speculation_waits_for_the_threshold(dataset_path, threshold, judged):
+    backpropagation = ScriptedBackpropagation(["bad", "speculated"])
+    search = make_search(
+        dataset_path, scores({"good": 8, "bad": 2}), backpropagation, speculation_threshold=threshold
+    )
+
+    search.train()
+
+    assert backpropagation.calls[1] == ("bad", judged)
+
+
+@pytest.mark.parametrize("options", [{"speculation_threshold": 1.5}, {"speculative_optimization": False}])
+def test_no_speculation_when_disabled_or_out_of_reach(dataset_path, options):
+    backpropagation = ScriptedBackpropagation(["bad", "optimized"])
+    search = make_search(dataset_path, scores({"good": 8, "bad": 2}), backpropagation, **options)
+
+    search.train()
+
+    # Both optimizations saw every row of a finished evaluation.
+    assert backpropagation.calls == [(None, 4), ("bad", 4)]
+    assert search.objective_prompt.get_last_prompt() == "optimized"